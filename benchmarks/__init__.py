@@ -0,0 +1,93 @@
+"""
+Benchmarks of the parsing and interpretation pipeline.
+
+Every file is timed stage by stage:
+  - xref_load: opening the document (PDFDocument.__init__)
+  - page_tree: walking the page tree (PDFPage.create_pages)
+  - tokenize: tokenizing the content streams (PDFContentParser)
+  - dispatch: running the operators (process_command_stream)
+  - convert_<type>: each of the converters, end to end
+
+The report is a JSON document:
+  {"meta": {...}, "files": [{"file", "bytes", "pages", "peak_rss_kb",
+   "stages": {stage: {"seconds", "pages_per_sec", "tokens_per_sec", ...}}}]}
+
+Run `python -m benchmarks --help` for the command line, a report can be
+compared against a previous one with --baseline to catch regressions.
+"""
+import os
+import glob
+import platform
+import tempfile
+from datetime import datetime
+from multiprocessing import Pool
+
+import pdfmajor
+
+from .stages import run_file, PIPELINE_STAGES, CONVERTERS
+from .generators import write_synthetic, GENERATORS
+
+SAMPLES_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'tests', 'samples', 'pdf')
+
+def sample_files() -> list:
+    return sorted(glob.glob(os.path.join(SAMPLES_FOLDER, '*.pdf')))
+
+def _run_file(args):
+    return run_file(*args)
+
+def run_benchmarks(
+    files: list = None,
+    synthetic_scale: float = 1.0,
+    repeat: int = 3,
+    stages = PIPELINE_STAGES,
+    converters = CONVERTERS,
+    isolate: bool = True
+) -> dict:
+    """Benchmarks the files (the sample corpus by default) and, unless
+    synthetic_scale is 0, the synthetic documents. With isolate, every file
+    runs in a fresh process so that its peak RSS is its own."""
+    if files is None:
+        files = sample_files()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        files = list(files)
+        if synthetic_scale:
+            files += write_synthetic(tmpdir, synthetic_scale)
+        tasks = [(file_path, repeat, stages, converters) for file_path in files]
+        if isolate:
+            with Pool(processes=1, maxtasksperchild=1) as pool:
+                results = pool.map(_run_file, tasks, chunksize=1)
+        else:
+            results = [_run_file(task) for task in tasks]
+    return {
+        'meta': {
+            'pdfmajor': '.'.join(map(str, pdfmajor.__version__)),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'repeat': repeat,
+        },
+        'files': results,
+    }
+
+def compare(report: dict, baseline: dict, max_slowdown: float = 0.25) -> list:
+    """Returns the (file, stage, baseline seconds, seconds) of the stages that
+    got more than max_slowdown (0.25 = 25%) slower than in the baseline, or
+    that failed (seconds is then None)."""
+    previous = {
+        (result['file'], stage): timing['seconds']
+        for result in baseline['files']
+        for (stage, timing) in result['stages'].items()
+        if 'seconds' in timing
+    }
+    regressions = []
+    for result in report['files']:
+        for (stage, timing) in result['stages'].items():
+            before = previous.get((result['file'], stage))
+            if before is None:
+                continue
+            if 'seconds' not in timing:
+                # failing now, it used to work
+                regressions.append((result['file'], stage, before, None))
+            elif timing['seconds'] > before * (1 + max_slowdown):
+                regressions.append((result['file'], stage, before, timing['seconds']))
+    return regressions
@@ -0,0 +1,58 @@
+"""
+Times parsing, interpretation and conversion stage by stage and writes the
+results as JSON. Exits with 1 when a stage got slower than in --baseline.
+"""
+import sys
+import json
+import argparse
+
+from . import run_benchmarks, compare, PIPELINE_STAGES, CONVERTERS
+
+def make_argparser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__, add_help=True)
+    parser.add_argument("files", type=str, nargs="*", help="Files to process (default is the sample corpus).")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs per stage, the fastest one is kept")
+    parser.add_argument("-s", "--stages", type=str, default=','.join(PIPELINE_STAGES), help="Comma-separated pipeline stages to time")
+    parser.add_argument("-c", "--converters", type=str, default=','.join(CONVERTERS), help="Comma-separated converters to time, empty for none")
+    parser.add_argument("-S", "--synthetic-scale", type=float, default=1.0, help="Size of the synthetic documents, 0 to skip them")
+    parser.add_argument("-o", "--output-file", type=str, default="-", help="Output file (default \"-\" is stdout)")
+    parser.add_argument("-b", "--baseline", type=str, default=None, help="Report of a previous run to compare against")
+    parser.add_argument("-t", "--max-slowdown", type=float, default=0.25, help="Slowdown tolerated against the baseline (0.25 = 25%%)")
+    parser.add_argument("--in-process", default=False, action="store_true", help="Run every file in this process (the peak RSS is then shared)")
+    return parser
+
+def split_names(value: str, choices: tuple) -> tuple:
+    names = tuple(name for name in value.split(',') if name)
+    unknown = set(names) - set(choices)
+    if unknown:
+        raise SystemExit(f"Unknown names {sorted(unknown)}, expected some of {list(choices)}")
+    return names
+
+def main(args=None):
+    A = make_argparser().parse_args(args=args)
+    report = run_benchmarks(
+        files=A.files or None,
+        synthetic_scale=A.synthetic_scale,
+        repeat=A.repeat,
+        stages=split_names(A.stages, PIPELINE_STAGES),
+        converters=split_names(A.converters, CONVERTERS),
+        isolate=not A.in_process
+    )
+    output = json.dumps(report, indent=2)
+    if A.output_file == '-':
+        print(output)
+    else:
+        with open(A.output_file, 'w') as fp:
+            fp.write(output)
+    if A.baseline is not None:
+        with open(A.baseline) as fp:
+            baseline = json.load(fp)
+        regressions = compare(report, baseline, A.max_slowdown)
+        for (file_name, stage, before, after) in regressions:
+            after = 'failed' if after is None else f"{after:.4f}s"
+            print(f"REGRESSION {file_name} {stage}: {before:.4f}s -> {after}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__': sys.exit(main())
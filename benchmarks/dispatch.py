@@ -0,0 +1,124 @@
+"""
+Measures the operator dispatch of process_command_stream (in operators per second)
+against the dispatch loop it replaced, on already tokenized content streams.
+"""
+import argparse
+import glob
+import math
+import os
+import time
+
+from pdfmajor.execptions import CommandProcessorError
+from pdfmajor.interpreter.commands import PDFCommands, PDFStateStack, LTXObject
+from pdfmajor.interpreter.commands import execute_commands, prep_state
+from pdfmajor.interpreter.PageInterpreter import PageInterpreter
+from pdfmajor.parser.PDFContentParser import PDFContentParser
+from pdfmajor.parser.PDFPage import PDFPage
+from pdfmajor.parser.PDFStream import list_value
+from pdfmajor.parser.PSStackParser import PSKeyword, keyword_name
+
+SAMPLES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'samples', 'pdf', '*.pdf')
+
+def legacy_execute_commands(objs, font_cache, state, profile=None):
+    """The dispatch loop as it was before the operator tables."""
+    commands = PDFCommands.get_commands(profile)
+    for obj in objs:
+        if isinstance(obj, PSKeyword):
+            name = keyword_name(obj)
+            method = name.replace('*', '_a').replace('"', '_w').replace("'", '_q')
+            if method in commands.keys():
+                func = commands[method]
+                nargs = func.__code__.co_argcount-1
+                if nargs:
+                    args = state.pop(nargs)
+                    if len(args) == nargs:
+                        func(state, *args)
+                    else:
+                        raise CommandProcessorError(f"Invalid Number of Args provided {method}")
+                else:
+                    func(state)
+        else:
+            state.argstack.append(obj)
+        for complete_item in state.complete_layout_items:
+            if isinstance(complete_item, LTXObject):
+                xobj_state = prep_state(
+                    state=PDFStateStack(),
+                    ctm=complete_item.t_matrix,
+                    resources=complete_item.resources,
+                    font_cache=font_cache
+                )
+                xobj_state.graphics = state.graphics.copy()
+                for item in legacy_execute_commands(
+                    PDFContentParser([complete_item.stream]),
+                    font_cache,
+                    xobj_state,
+                    profile
+                ):
+                    complete_item.add(item)
+            yield complete_item
+        state.complete_layout_items = []
+
+def load_pages(doc):
+    """Returns (page, tokens) for every page of the document."""
+    pages = []
+    for page in PDFPage.create_pages(doc):
+        tokens = list(PDFContentParser(list_value(page.contents)))
+        pages.append((page, tokens))
+    return pages
+
+def count_operators(pages) -> int:
+    return sum(1 for (_, tokens) in pages for obj in tokens if isinstance(obj, PSKeyword))
+
+def time_dispatch(run, pages, font_cache: dict, profile: str = None) -> (float, list):
+    """Time spent in the dispatch loop over every page and the kinds of items it produced."""
+    elapsed = 0.0
+    kinds = []
+    for (page_num, (page, tokens)) in enumerate(pages):
+        state = PageInterpreter(page, page_num, font_cache, ignore_bad_chars=True).state
+        start = time.perf_counter()
+        items = list(run(tokens, font_cache, state, profile))
+        elapsed += time.perf_counter() - start
+        kinds.extend(type(item).__name__ for item in items)
+    return elapsed, kinds
+
+def compare(pages, repeat: int, profile: str = None) -> (float, float):
+    """Best times of the legacy and the table dispatch, runs are interleaved
+    so that both see the same machine load."""
+    font_cache = {}
+    best_legacy = best_table = float('inf')
+    for _ in range(repeat):
+        (legacy, legacy_kinds) = time_dispatch(legacy_execute_commands, pages, font_cache, profile)
+        (table, table_kinds) = time_dispatch(execute_commands, pages, font_cache, profile)
+        if legacy_kinds != table_kinds:
+            raise AssertionError("the dispatch loops produced different items")
+        best_legacy = min(best_legacy, legacy)
+        best_table = min(best_table, table)
+    return best_legacy, best_table
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__, add_help=True)
+    parser.add_argument("files", type=str, nargs="*", help="Files to process (default is the sample corpus).")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Runs per file, the fastest one is kept")
+    parser.add_argument("-p", "--profile", type=str, default=None, help="Command profile (e.g. text)")
+    return parser
+
+def main(args=None):
+    A = make_argparser().parse_args(args=args)
+    files = A.files or sorted(glob.glob(SAMPLES))
+    total_ops = total_legacy = total_table = 0.0
+    speedups = []
+    print(f"{'file':<20} {'ops':>8} {'legacy ops/s':>14} {'table ops/s':>14} {'speedup':>8}")
+    for file_path in files:
+        with open(file_path, 'rb') as fp:
+            pages = load_pages(PDFPage.open_document(fp, check_extractable=False))
+            ops = count_operators(pages)
+            (legacy, table) = compare(pages, A.repeat, A.profile)
+        speedups.append(legacy/table)
+        total_ops += ops
+        total_legacy += legacy
+        total_table += table
+        print(f"{os.path.basename(file_path):<20} {ops:>8} {ops/legacy:>14,.0f} {ops/table:>14,.0f} {legacy/table:>7.2f}x")
+    print(f"{'total':<20} {int(total_ops):>8} {total_ops/total_legacy:>14,.0f} {total_ops/total_table:>14,.0f} {total_legacy/total_table:>7.2f}x")
+    print(f"geometric mean speedup: {math.exp(sum(map(math.log, speedups)) / len(speedups)):.2f}x")
+
+if __name__ == '__main__': main()
@@ -0,0 +1,143 @@
+"""
+Synthetic documents for the benchmarks, sized to stress one part of the
+pipeline each: many_pages the page tree, huge_page the content stream,
+repeated_form the form xobjects.
+"""
+import os
+import zlib
+from io import BytesIO
+
+FONT = b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>'
+
+def write_pdf(objs: dict) -> bytes:
+    """Serializes {objid: body} (objects 1 and 2 being the catalog and the
+    page-tree root) with a classic xref table."""
+    out = BytesIO()
+    out.write(b'%PDF-1.4\n')
+    offsets = {}
+    for objid in sorted(objs):
+        offsets[objid] = out.tell()
+        out.write(b'%d 0 obj\n%s\nendobj\n' % (objid, objs[objid]))
+    size = max(objs)+1
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % size)
+    for objid in range(1, size):
+        if objid in offsets:
+            out.write(b'%010d 00000 n \n' % offsets[objid])
+        else:
+            out.write(b'0000000000 65535 f \n')
+    out.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, xref))
+    return out.getvalue()
+
+def make_stream(data: bytes, compress: bool = True, attrs: bytes = b'') -> bytes:
+    if compress:
+        data = zlib.compress(data)
+        attrs += b' /Filter /FlateDecode'
+    return b'<< /Length %d%s >>\nstream\n%s\nendstream' % (len(data), attrs, data)
+
+def text_lines(nlines: int, y0: int = 800) -> bytes:
+    return b''.join(
+        b'BT /F1 10 Tf 40 %d Td (Line %d of a synthetic benchmark page) Tj ET\n' % (y0 - (i % 75) * 10, i)
+        for i in range(nlines)
+    )
+
+def shapes(nshapes: int) -> bytes:
+    # neither horizontal nor vertical lines, some writers divide by their extent
+    return b''.join(
+        b'q %d %d %d RG 1 w %d %d m %d %d l S %d %d 20 10 re f Q\n' % (
+            i % 256, (i*7) % 256, (i*13) % 256,
+            i % 500, i % 700, i % 500 + 5 + i % 40, i % 700 + 5 + i % 30,
+            (i*11) % 500, (i*17) % 700
+        )
+        for i in range(nshapes)
+    )
+
+def many_pages(npages: int = 2000, per_node: int = 50) -> bytes:
+    """A document with npages small pages, grouped under intermediate /Pages nodes."""
+    objs = {
+        1: b'<< /Type /Catalog /Pages 2 0 R >>',
+        3: FONT,
+    }
+    nodes = []
+    objid = 4
+    for start in range(0, npages, per_node):
+        node_id = objid
+        kids = []
+        objid += 1
+        for pageno in range(start, min(npages, start+per_node)):
+            (page_id, content_id) = (objid, objid+1)
+            objid += 2
+            objs[content_id] = make_stream(text_lines(3) + b'BT /F1 8 Tf 40 20 Td (page %d) Tj ET' % pageno)
+            objs[page_id] = b'<< /Type /Page /Parent %d 0 R /Contents %d 0 R >>' % (node_id, content_id)
+            kids.append(page_id)
+        objs[node_id] = b'<< /Type /Pages /Parent 2 0 R /Kids [%s] /Count %d >>' % (
+            b' '.join(b'%d 0 R' % k for k in kids), len(kids)
+        )
+        nodes.append(node_id)
+    objs[2] = b'<< /Type /Pages /Kids [%s] /Count %d /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> >>' % (
+        b' '.join(b'%d 0 R' % k for k in nodes), npages
+    )
+    return write_pdf(objs)
+
+def huge_page(nlines: int = 20000, nshapes: int = 20000) -> bytes:
+    """A single page with a very long content stream of text and paths."""
+    return write_pdf({
+        1: b'<< /Type /Catalog /Pages 2 0 R >>',
+        2: b'<< /Type /Pages /Kids [4 0 R] /Count 1 >>',
+        3: FONT,
+        4: b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents 5 0 R /Resources << /Font << /F1 3 0 R >> >> >>',
+        5: make_stream(text_lines(nlines) + shapes(nshapes)),
+    })
+
+def repeated_form(npages: int = 2000) -> bytes:
+    """Pages painting the same logo and footer form xobjects, moved around and
+    scaled from page to page."""
+    logo = b'BT /F1 12 Tf 0 0 Td (ACME Corp.) Tj ET 0 0 1 rg 0 -4 80 2 re f 0 0 m 10 20 15 20 30 0 c S'
+    footer = b'BT /F1 8 Tf 0 0 Td (Confidential - do not distribute) Tj ET 0 10 m 500 10 l S'
+    resources = b' /Resources << /Font << /F1 3 0 R >> >>'
+    objs = {
+        1: b'<< /Type /Catalog /Pages 2 0 R >>',
+        3: FONT,
+        4: make_stream(logo, attrs=b' /Type /XObject /Subtype /Form /BBox [0 -5 90 25]' + resources),
+        5: make_stream(footer, attrs=b' /Type /XObject /Subtype /Form /BBox [0 0 500 20]' + resources),
+    }
+    kids = []
+    objid = 6
+    for pageno in range(npages):
+        (page_id, content_id) = (objid, objid+1)
+        objid += 2
+        objs[content_id] = make_stream(
+            b'q 1 0 0 1 40 780 cm /Logo Do Q '
+            b'q 1 0 0 1 %d 20 cm /Footer Do Q ' % (40 + pageno % 10) +
+            b'q 0.5 0 0 0.5 500 800 cm /Logo Do Q ' +
+            text_lines(3)
+        )
+        objs[page_id] = b'<< /Type /Page /Parent 2 0 R /Contents %d 0 R >>' % content_id
+        kids.append(page_id)
+    objs[2] = (
+        b'<< /Type /Pages /Kids [%s] /Count %d /MediaBox [0 0 612 842] '
+        b'/Resources << /Font << /F1 3 0 R >> /XObject << /Logo 4 0 R /Footer 5 0 R >> >> >>'
+    ) % (b' '.join(b'%d 0 R' % k for k in kids), npages)
+    return write_pdf(objs)
+
+GENERATORS = {
+    'many-pages': many_pages,
+    'huge-page': huge_page,
+    'repeated-form': repeated_form,
+}
+
+def write_synthetic(outdir: str, scale: float = 1.0) -> list:
+    """Writes every synthetic document to outdir and returns their paths.
+    scale multiplies their default sizes."""
+    sizes = {
+        'many-pages': dict(npages=max(1, int(2000*scale))),
+        'huge-page': dict(nlines=max(1, int(20000*scale)), nshapes=max(1, int(20000*scale))),
+        'repeated-form': dict(npages=max(1, int(2000*scale))),
+    }
+    paths = []
+    for (name, generate) in GENERATORS.items():
+        path = os.path.join(outdir, 'synthetic-%s.pdf' % name)
+        with open(path, 'wb') as fp:
+            fp.write(generate(**sizes[name]))
+        paths.append(path)
+    return paths
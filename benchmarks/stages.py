@@ -0,0 +1,116 @@
+"""
+Times the stages of the pipeline on one file. Every run starts again from
+a freshly opened document so that no stage benefits from the caches filled
+by a previous run, the fastest run of each stage is kept.
+"""
+import os
+import sys
+import time
+import tempfile
+
+from pdfmajor.converters import convert_file
+from pdfmajor.interpreter.PageInterpreter import PageInterpreter
+from pdfmajor.interpreter.commands import execute_commands
+from pdfmajor.parser.PDFContentParser import PDFContentParser
+from pdfmajor.parser.PDFPage import PDFPage
+from pdfmajor.parser.PDFStream import list_value
+from pdfmajor.parser.PSStackParser import PSKeyword
+
+PIPELINE_STAGES = ('xref_load', 'page_tree', 'tokenize', 'dispatch')
+CONVERTERS = ('html', 'xml', 'json', 'yaml', 'text')
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of the current process, in KiB, 0 where it
+    is not known (the resource module is Unix-only)."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB everywhere else
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else 0.0
+
+def run_pipeline(file_path: str) -> dict:
+    """One run of the pipeline stages, returns {stage: (seconds, count)}."""
+    timings = {}
+    with open(file_path, 'rb') as fp:
+        start = time.perf_counter()
+        doc = PDFPage.open_document(fp, check_extractable=False)
+        timings['xref_load'] = (time.perf_counter() - start, 1)
+
+        start = time.perf_counter()
+        pages = list(PDFPage.create_pages(doc))
+        timings['page_tree'] = (time.perf_counter() - start, len(pages))
+
+        start = time.perf_counter()
+        tokens = [list(PDFContentParser(list_value(page.contents))) for page in pages]
+        timings['tokenize'] = (time.perf_counter() - start, sum(len(objs) for objs in tokens))
+
+        font_cache = {}
+        elapsed = 0.0
+        for (page_num, (page, objs)) in enumerate(zip(pages, tokens)):
+            state = PageInterpreter(page, page_num, font_cache, ignore_bad_chars=True).state
+            start = time.perf_counter()
+            for _ in execute_commands(objs, font_cache, state):
+                pass
+            elapsed += time.perf_counter() - start
+        ops = sum(1 for objs in tokens for obj in objs if isinstance(obj, PSKeyword))
+        timings['dispatch'] = (elapsed, ops)
+    return timings
+
+def run_converter(file_path: str, out_type: str, outdir: str) -> float:
+    output_file = os.path.join(outdir, 'output.' + out_type)
+    start = time.perf_counter()
+    convert_file(
+        file_path,
+        output_file=output_file,
+        image_folder_path=outdir,
+        out_type=out_type,
+        check_extractable=False,
+        ignore_bad_chars=True,
+    )
+    return time.perf_counter() - start
+
+def run_file(file_path: str, repeat: int = 3, stages=PIPELINE_STAGES, converters=CONVERTERS) -> dict:
+    """Benchmarks one file, see the package documentation for the report layout."""
+    best = {}
+    errors = {}
+    npages = None
+    # the pipeline runs at least once, it also counts the pages
+    for _ in range(repeat if stages else 1):
+        timings = run_pipeline(file_path)
+        npages = timings['page_tree'][1]
+        for (stage, (seconds, count)) in timings.items():
+            if stage in stages and (stage not in best or seconds < best[stage][0]):
+                best[stage] = (seconds, count)
+    with tempfile.TemporaryDirectory() as outdir:
+        for out_type in converters:
+            try:
+                seconds = min(run_converter(file_path, out_type, outdir) for _ in range(repeat))
+            except Exception as e:
+                errors['convert_' + out_type] = repr(e)
+                continue
+            best['convert_' + out_type] = (seconds, npages)
+
+    report = {}
+    for (stage, (seconds, count)) in best.items():
+        result = {'seconds': seconds}
+        if stage == 'tokenize':
+            result.update(tokens=count, tokens_per_sec=_rate(count, seconds))
+        elif stage == 'dispatch':
+            result.update(ops=count, ops_per_sec=_rate(count, seconds))
+        if stage != 'xref_load':
+            result.update(pages=npages, pages_per_sec=_rate(npages, seconds))
+        report[stage] = result
+    for (stage, error) in errors.items():
+        report[stage] = {'error': error}
+    return {
+        'file': os.path.basename(file_path),
+        'bytes': os.path.getsize(file_path),
+        'pages': npages,
+        'stages': report,
+        'peak_rss_kb': peak_rss_kb(),
+    }
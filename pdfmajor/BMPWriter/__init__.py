@@ -2,7 +2,7 @@
 import struct
 from io import BytesIO
                 
-from ..parser.PDFStream import LITERALS_DCT_DECODE, PDFStream
+from ..parser.PDFStream import LITERALS_DCT_DECODE, PDFStream, ChunkReader
 
 def align32(x):
     return ((x+3)//4)*4
@@ -14,11 +14,10 @@ class BMPWriter(object):
     @classmethod
     def write_all(cls, fp, stream: PDFStream, bits: int, width: float, height: float, step: float):
         bmp = cls(fp, 1, width, height)
-        data = stream.get_data()
-        i = 0
+        # rows are written as they are decoded
+        data = ChunkReader(stream.iter_data)
         for y in range(height):
-            bmp.write_line(y, data[i:i+step])
-            i += step
+            bmp.write_line(y, data.read(step))
 
     def __init__(self, fp, bits, width, height):
         self.fp = fp
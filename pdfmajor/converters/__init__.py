@@ -1,6 +1,9 @@
 import io
 import os
 import re
+import asyncio
+import functools
+from concurrent.futures import Executor
 
 from typing import List, Optional
 
@@ -111,4 +114,14 @@ def convert_file(
             dont_export_images=dont_export_images,
             debug_level=debug_level,
         )
-    else: raise ConverterException("Please specify out_type as 'html' or 'xml' or 'json' or 'text' or 'yaml'")
\ No newline at end of file
+    else: raise ConverterException("Please specify out_type as 'html' or 'xml' or 'json' or 'text' or 'yaml'")
+
+async def convert_file_async(input_file: str, *args, executor: Optional[Executor] = None, **kwargs):
+    """Runs convert_file on the executor (the loop's default one when None).
+    Cancelling the call stops waiting for it, a conversion that has not
+    started yet on a process pool is dropped but one already running in a
+    thread finishes in the background."""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, functools.partial(convert_file, input_file, *args, **kwargs))
+
+from .batch import convert_batch
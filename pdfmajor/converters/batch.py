@@ -0,0 +1,259 @@
+import os
+import re
+import glob
+import fnmatch
+import json
+import time
+import signal
+from collections import deque
+from multiprocessing import Pool, Queue, cpu_count
+from queue import Empty
+from typing import Iterable, Iterator, Optional
+
+from ..utils import get_logger
+from ..execptions import ConversionTimeout
+from . import convert_file
+
+log = get_logger(__name__)
+
+GLOB_CHARS = re.compile(r'[*?\[]')
+
+# how often the batch checks on its running files, and how long past its
+# timeout a started file may go unanswered before its worker is taken as lost
+POLL_INTERVAL = 0.5
+LOST_GRACE = 30
+
+# where a worker announces (input path, time.time()) when it starts a file
+_started_queue = None
+
+def iter_batch_inputs(sources: Iterable[str], manifest: Optional[str] = None, pattern: str = '*.pdf') -> Iterator[str]:
+    """Expands globs, directories (walked for pattern, in sorted order) and
+    the lines of a manifest file (blank ones and '#' comments skipped) into
+    absolute paths, each path yielded once."""
+    def expand(source: str):
+        if os.path.isdir(source):
+            for (dirpath, dirnames, filenames) in os.walk(source):
+                dirnames.sort()
+                for file_name in sorted(fnmatch.filter(filenames, pattern)):
+                    yield os.path.join(dirpath, file_name)
+        elif GLOB_CHARS.search(source):
+            for file_path in sorted(glob.iglob(source, recursive=True)):
+                if os.path.isfile(file_path):
+                    yield file_path
+        else:
+            yield source
+    def lines():
+        if manifest is not None:
+            with open(manifest) as fp:
+                for line in fp:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        yield line
+    seen = set()
+    for source in list(sources) + list(lines()):
+        for file_path in expand(source):
+            file_path = os.path.abspath(file_path)
+            if file_path not in seen:
+                seen.add(file_path)
+                yield file_path
+
+def batch_output_path(input_file: str, out_type: str, output_dir: Optional[str] = None, root: Optional[str] = None) -> str:
+    """Where a batch writes the output of input_file: next to it, as
+    convert_file does, or under output_dir at its path relative to root."""
+    output_file = re.sub(r"(\.\w+)?$", "." + out_type, input_file, count=1)
+    if output_dir is None:
+        return output_file
+    return os.path.join(output_dir, os.path.relpath(output_file, root or os.path.dirname(input_file)))
+
+##  BatchJournal
+##
+class BatchJournal:
+
+    """An append-only log of the files a batch finished, one JSON record
+    per line, so that an interrupted run can skip them when restarted.
+    A line cut short by a crash is ignored."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fp = None
+
+    def load(self) -> dict:
+        """Returns input path -> its latest record."""
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path) as fp:
+            for line in fp:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    log.warning('Skipping a broken journal line in %s', self.path)
+                    continue
+                records[record['input']] = record
+        return records
+
+    def write(self, record: dict):
+        if self.fp is None:
+            self.fp = open(self.path, 'a+')
+            if self.fp.tell():
+                self.fp.seek(self.fp.tell()-1)
+                if self.fp.read(1) != '\n':
+                    # end the line a crash cut short
+                    self.fp.write('\n')
+        self.fp.write(json.dumps(record) + '\n')
+        self.fp.flush()
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+def _on_alarm(signum, frame):
+    raise ConversionTimeout('Conversion timed out')
+
+def _init_worker(started_queue = None):
+    global _started_queue
+    _started_queue = started_queue
+    if hasattr(signal, 'SIGALRM'):
+        signal.signal(signal.SIGALRM, _on_alarm)
+
+def _convert_task(task: tuple) -> dict:
+    """Converts one file in a worker, returns its journal record."""
+    (input_file, output_file, timeout, kwargs) = task
+    if _started_queue is not None:
+        _started_queue.put((input_file, time.time()))
+    record = {'input': input_file, 'output': output_file, 'pid': os.getpid()}
+    start = time.perf_counter()
+    try:
+        record['bytes'] = os.path.getsize(input_file)
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        if timeout and hasattr(signal, 'SIGALRM'):
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            convert_file(input_file, output_file, **kwargs)
+        finally:
+            if timeout and hasattr(signal, 'SIGALRM'):
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        record['status'] = 'done'
+    except Exception as e:
+        record['status'] = 'failed'
+        record['error'] = '%s: %s' % (type(e).__name__, e)
+        if os.path.exists(output_file):
+            # do not leave half a file behind
+            os.remove(output_file)
+    record['seconds'] = time.perf_counter() - start
+    return record
+
+def convert_batch(
+        inputs: Iterable[str],
+        out_type: str = 'text',
+        output_dir: Optional[str] = None,
+        processes: Optional[int] = None,
+        timeout: float = 0,
+        max_files_per_worker: int = 0,
+        journal_path: Optional[str] = None,
+        retry_failed: bool = False,
+        callback = None,
+        **kwargs
+    ) -> dict:
+    """Runs convert_file over inputs on a pool of processes (os.cpu_count()
+    when None), kwargs are passed on to it.
+
+    A file still converting after timeout seconds fails (0 means no
+    limit, it needs SIGALRM so it is ignored on Windows), one unanswered
+    LOST_GRACE seconds later fails as 'Worker lost' and the pool is
+    replaced, the other running files start again on it. Workers are
+    replaced after max_files_per_worker files (0 means never) to cap their
+    memory growth. With journal_path every finished file is recorded
+    there, and the files a previous run recorded as done (and as failed,
+    unless retry_failed) are skipped. callback is called with the record
+    of every file as it finishes. Returns the totals of the run.
+    """
+    inputs = list(inputs)
+    root = None
+    if output_dir is not None and inputs:
+        root = os.path.commonpath([os.path.dirname(input_file) for input_file in inputs])
+    journal = BatchJournal(journal_path) if journal_path is not None else None
+    previous = journal.load() if journal is not None else {}
+    skip = set(('done', 'failed')) if not retry_failed else set(('done',))
+    tasks = [
+        (input_file, batch_output_path(input_file, out_type, output_dir, root), timeout, dict(kwargs, out_type=out_type))
+        for input_file in inputs
+        if previous.get(input_file, {}).get('status') not in skip
+    ]
+    summary = {
+        'files': len(inputs), 'skipped': len(inputs)-len(tasks), 'done': 0, 'failed': 0,
+        'bytes': 0, 'seconds': 0.0, 'cpu_seconds': 0.0, 'failures': [],
+    }
+    def finish(record: dict):
+        if journal is not None:
+            journal.write(record)
+        summary[record['status']] += 1
+        summary['cpu_seconds'] += record['seconds']
+        if record['status'] == 'done':
+            summary['bytes'] += record['bytes']
+        else:
+            log.warning('Failed to convert %s: %s', record['input'], record['error'])
+            summary['failures'].append((record['input'], record['error']))
+        if callback is not None:
+            callback(record)
+    processes = processes or cpu_count()
+    start = time.perf_counter()
+    def make_pool():
+        # a new queue with every pool, a worker killed while writing to one
+        # may leave it broken
+        started_queue = Queue()
+        pool = Pool(processes=processes, initializer=_init_worker, initargs=(started_queue,),
+                    maxtasksperchild=max_files_per_worker or None)
+        return (pool, started_queue)
+    (pool, started_queue) = make_pool()
+    try:
+        # no more files are handed out than there are workers
+        (queue, running, started) = (deque(tasks), deque(), {})
+        while queue or running:
+            while queue and len(running) < processes:
+                task = queue.popleft()
+                running.append((task, pool.apply_async(_convert_task, (task,))))
+            running[0][1].wait(POLL_INTERVAL)
+            while True:
+                try:
+                    (input_file, at) = started_queue.get_nowait()
+                except Empty:
+                    break
+                started[input_file] = at
+            now = time.time()
+            lost = False
+            for item in list(running):
+                (task, result) = item
+                if result.ready():
+                    running.remove(item)
+                    started.pop(task[0], None)
+                    finish(result.get())
+                elif timeout and task[0] in started and timeout+LOST_GRACE < now-started[task[0]]:
+                    # the worker died or is stuck where the alarm cannot reach it
+                    running.remove(item)
+                    finish({'input': task[0], 'output': task[1], 'status': 'failed',
+                            'error': 'Worker lost', 'seconds': now-started.pop(task[0])})
+                    lost = True
+            if lost:
+                # a stuck worker keeps its slot, start over on a new pool
+                # with the files that were still running or waiting for one
+                pool.terminate()
+                pool.join()
+                started_queue.close()
+                queue.extendleft(reversed([task for (task, _) in running]))
+                running.clear()
+                started.clear()
+                (pool, started_queue) = make_pool()
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        started_queue.close()
+        if journal is not None:
+            journal.close()
+    summary['seconds'] = time.perf_counter() - start
+    seconds = summary['seconds'] or 1e-9
+    summary['files_per_second'] = (summary['done']+summary['failed']) / seconds
+    summary['mb_per_second'] = summary['bytes'] / seconds / (1 << 20)
+    return summary
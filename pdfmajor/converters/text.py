@@ -25,7 +25,8 @@ def convert_to_text(
         check_extractable=check_extractable,
         ignore_bad_chars=ignore_bad_chars,
         pagenos=pagenos,
-        debug_level=debug_level
+        debug_level=debug_level,
+        profile="text"
     )
     with open(output_file_path, 'wb') as outfp:
         def process_container(container: LTXObject):
@@ -102,4 +102,7 @@ class ConverterException(PDFMajorException):
     pass 
 
 class FileAccessException(ConverterException):
-    pass
\ No newline at end of file
+    pass
+
+class ConversionTimeout(ConverterException):
+    pass
@@ -3,10 +3,11 @@ from pdfmajor.parser.PDFStream import list_value
 
 from .commands import PDFStateStack
 from .commands import process_command_stream, prep_state
+from .commands.utils import resources_key
 
 class PageInterpreter:
 
-    def __init__(self, page: PDFPage, page_num: int, font_cache: dict = None, ignore_bad_chars = False):
+    def __init__(self, page: PDFPage, page_num: int, font_cache: dict = None, ignore_bad_chars = False, profile: str = None):
         (x0, y0, x1, y1) = page.mediabox
         if page.rotate == 90:
             ctm = [0, -1, 1, 0, -y0, x1]
@@ -21,6 +22,7 @@ class PageInterpreter:
         self.font_cache = font_cache if font_cache is not None else {}
         self.page = page
         self.page_num = page_num
+        self.profile = profile
         self.height = y1-y0
         self.width = x1-x0
 
@@ -30,7 +32,11 @@ class PageInterpreter:
             ctm=ctm, 
             resources=page.resources, 
             font_cache=self.font_cache,
-            ignore_bad_chars=ignore_bad_chars
+            ignore_bad_chars=ignore_bad_chars,
+            content_cache=page.doc.content_cache,
+            form_cache=page.doc.form_cache,
+            resource_cache=page.doc.resource_cache,
+            resources_key=resources_key(page.attrs.get('Resources'))
         )
 
     
@@ -38,9 +44,40 @@ class PageInterpreter:
         for item in process_command_stream(
             streams=list_value(self.page.contents),
             font_cache=self.font_cache,
-            state=self.state
+            state=self.state,
+            profile=self.profile
         ):
             yield item
 
     def __repr__(self) -> str:
-        return f"<Page:{self.page_num} width={self.width} height={self.height}/>"
\ No newline at end of file
+        return f"<Page:{self.page_num} width={self.width} height={self.height}/>"
+
+    def release(self):
+        """Drops the objects the document cached for this page alone, see PDFPage.release."""
+        self.page.release()
+
+class InterpretedPage(PageInterpreter):
+    """A page whose items were already interpreted (e.g. by a worker process).
+
+    It carries no reference to the document, so it can be pickled and
+    iterated after the pdf-file was closed.
+    """
+
+    def __init__(self, page_num: int, width: float, height: float, items: list):
+        self.font_cache = {}
+        self.page = None
+        self.page_num = page_num
+        self.profile = None
+        self.height = height
+        self.width = width
+        self.items = items
+
+    @classmethod
+    def from_page(cls, page: PageInterpreter):
+        return cls(page.page_num, page.width, page.height, list(page))
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def release(self):
+        return
@@ -3,14 +3,17 @@ from typing import List
 from pdfmajor.execptions import EmptyDocumentError
 
 from ..parser.PDFPage import PDFPage
-from ..utils import set_log_level, get_logger, logging
+from ..parser.ByteSource import ByteSource, open_input
+from ..utils import set_log_level, get_logger, logging, CachePolicy
 from .commands.state import PDFStateStack, PDFColorSpace, PREDEFINED_COLORSPACE
 from .commands import PDFCommands
+from .commands import FontCache, DocumentFontCache
 from .commands import LTTextBlock, LTCharBlock, LTChar
 from .commands import LTCurve, LTLine, LTHorizontalLine, LTVerticalLine, LTRect
 from .commands import LTImage
 from .commands import LTXObject
-from .PageInterpreter import PageInterpreter
+from .PageInterpreter import PageInterpreter, InterpretedPage
+from .parallel import iter_parallel_pages, iter_threaded_pages, iter_prefetched_pages
 
 log = get_logger(__name__)
 
@@ -26,6 +29,17 @@ class PDFInterpreter:
         preload: bool = False,
         ignore_bad_chars: bool = False,
         debug_level: int = logging.WARNING, 
+        workers: int = 0,
+        threads: int = 0,
+        prefetch: int = 0,
+        retain_pages: bool = True,
+        use_mmap: bool = False,
+        cache_policy: CachePolicy = None,
+        profile: str = None,
+        shared_font_cache: FontCache = None,
+        fallback = True,
+        recovery_path: str = None,
+        index_path: str = None,
     ):
         self.input_file_path = input_file_path
         self.maxpages = maxpages
@@ -35,6 +49,23 @@ class PDFInterpreter:
         self.pagenos = pagenos
         self.ignore_bad_chars = ignore_bad_chars
         self.debug_level = debug_level
+        if 1 < workers and 1 < threads:
+            raise ValueError('workers and threads cannot be used together')
+        if 1 < workers and prefetch:
+            raise ValueError('workers and prefetch cannot be used together')
+        self.workers = workers
+        self.threads = threads
+        self.prefetch = prefetch
+        self.retain_pages = retain_pages
+        self.use_mmap = use_mmap
+        self.cache_policy = cache_policy
+        PDFCommands.get_commands(profile) # fail early on unknown profiles
+        self.profile = profile
+        self.shared_font_cache = shared_font_cache
+        self.fallback = fallback
+        self.recovery_path = recovery_path
+        self.index_path = index_path
+        self.document = None
         self.__pages = []
         if preload:
             for _ in self.__load_pages():
@@ -43,26 +74,95 @@ class PDFInterpreter:
     def __load_pages(self):
         set_log_level(self.debug_level)
         log.info("Opening file...")
-        with open(self.input_file_path, 'rb') as input_file:
-            font_cache = {}
+        with open_input(self.input_file_path) as input_file:
+            font_cache = DocumentFontCache(self.shared_font_cache)
             log.info("Parsing file...")
-            pages = PDFPage.get_pages(
-                input_file, 
-                pagenos=self.pagenos, 
-                maxpages=self.maxpages, 
-                password=self.password, 
-                caching=self.caching, 
-                check_extractable=self.check_extractable
-            )
-            for page_num, page in enumerate(pages):
-                self.__pages.append(PageInterpreter(page, page_num, font_cache, ignore_bad_chars=self.ignore_bad_chars))
-                yield self.__pages[-1]
-            log.info(f"Done Reading {len(self.__pages)} pages.")
+            self.document = self._open_document(input_file)
+            if self.workers > 1:
+                pages = self.__load_pages_in_workers()
+            else:
+                pages = (
+                    PageInterpreter(page, page_num, font_cache, ignore_bad_chars=self.ignore_bad_chars, profile=self.profile)
+                    for page_num, (_, page) in enumerate(PDFPage.select_pages(
+                        self.document, 
+                        pagenos=self.pagenos, 
+                        maxpages=self.maxpages,
+                        release=not self.retain_pages
+                    ))
+                )
+                if self.prefetch > 0:
+                    pages = iter_prefetched_pages(pages, self.prefetch)
+                if self.threads > 1:
+                    pages = iter_threaded_pages(pages, self.threads, release=not self.retain_pages)
+            count = 0
+            try:
+                for page in pages:
+                    count += 1
+                    if self.retain_pages:
+                        self.__pages.append(page)
+                        yield page
+                    else:
+                        # streaming: once the consumer is past a page nothing keeps it
+                        yield page
+                        page.release()
+                        page = None
+            finally:
+                # stops the background threads before the file is closed
+                pages.close()
+                self.document.close()
+            log.info(f"Done Reading {count} pages.")
         set_log_level(logging.WARNING)
         
-        if len(self.__pages) == 0:
+        if count == 0:
             raise EmptyDocumentError("No pages found in pdf-file")
     
+    def _open_document(self, input_file):
+        return PDFPage.open_document(
+            input_file, 
+            password=self.password, 
+            caching=self.caching, 
+            check_extractable=self.check_extractable,
+            use_mmap=self.use_mmap,
+            cache_policy=self.cache_policy,
+            fallback=self.fallback,
+            recovery_path=self.recovery_path,
+            index_path=self.index_path
+        )
+
+    def _select_pagenos(self, document) -> List[int]:
+        return [
+            pageno for (pageno, _) in 
+            PDFPage.select_pages(document, pagenos=self.pagenos, maxpages=self.maxpages)
+        ]
+
+    def __load_pages_in_workers(self):
+        return iter_parallel_pages(self._worker_options(), self._select_pagenos(self.document), self.workers)
+
+    def _worker_options(self) -> dict:
+        """What worker processes need to open the document and interpret its pages."""
+        return {
+            'input_file_path': self.input_file_path if isinstance(self.input_file_path, ByteSource) else str(self.input_file_path),
+            'password': self.password,
+            'caching': self.caching,
+            'use_mmap': self.use_mmap,
+            'cache_policy': self.cache_policy,
+            'ignore_bad_chars': self.ignore_bad_chars,
+            'profile': self.profile,
+            'retain_pages': self.retain_pages,
+            'shared_font_cache': self.shared_font_cache,
+            'fallback': self.fallback,
+            'recovery_path': self.recovery_path,
+            'index_path': self.index_path,
+            'debug_level': self.debug_level,
+        }
+
+    def cache_stats(self) -> dict:
+        """Cache counters of the document being read (see PDFDocument.cache_stats),
+        with workers only the pages selection made in this process is counted."""
+        if self.document is None:
+            return {}
+        return self.document.cache_stats()
+
     def __iter__(self):
         if len(self.__pages) > 0:
             set_log_level(self.debug_level)
@@ -71,4 +171,6 @@ class PDFInterpreter:
             set_log_level(logging.WARNING)
         else:
             for page in self.__load_pages():
-                yield page
\ No newline at end of file
+                yield page
+
+from .aio import AsyncPDFInterpreter
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import AsyncIterator
+
+from pdfmajor.execptions import EmptyDocumentError
+
+from ..utils import get_logger
+from ..parser.ByteSource import open_input
+from . import PDFInterpreter
+from .PageInterpreter import InterpretedPage
+from .parallel import interpret_pages
+
+log = get_logger(__name__)
+
+class AsyncPDFInterpreter:
+    """Reads a document off the event loop and yields its pages as
+    InterpretedPage objects.
+
+    With a thread executor (the loop's default one when None) a single
+    task reads the pages in order, and at most queue_size pages wait for
+    the consumer before it pauses. With a ProcessPoolExecutor the pages
+    are interpreted chunk_size at a time, with at most queue_size chunks
+    submitted ahead of the consumer. Leaving the loop early or cancelling
+    the consuming task stops the producer after the page it is reading,
+    and drops the chunks not started yet. The other arguments are those of
+    PDFInterpreter, except preload.
+
+    Typical usage:
+      async for page in AsyncPDFInterpreter("/path/to/pdf.pdf"):
+          for item in page:
+              ...
+    """
+
+    # how often a producer waiting for room checks whether it was stopped
+    POLL_INTERVAL = 0.1
+
+    def __init__(self,
+        input_file_path: str,
+        executor: Executor = None,
+        queue_size: int = 4,
+        chunk_size: int = 8,
+        **kwargs
+    ):
+        if kwargs.get('preload'):
+            raise ValueError('preload would read the document on the event loop')
+        if queue_size < 1 or chunk_size < 1:
+            raise ValueError('queue_size and chunk_size must be at least 1')
+        self.interpreter = PDFInterpreter(input_file_path, **kwargs)
+        self.executor = executor
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        # pages handed to the consumer's queue so far
+        self.produced = 0
+
+    def __aiter__(self) -> AsyncIterator[InterpretedPage]:
+        if isinstance(self.executor, ProcessPoolExecutor):
+            return self._iter_processes()
+        return self._iter_threads()
+
+    async def _iter_threads(self):
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue()
+        slots = threading.Semaphore(self.queue_size)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            while not slots.acquire(timeout=self.POLL_INTERVAL):
+                if stop.is_set():
+                    return False
+            if stop.is_set():
+                return False
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # the loop was closed meanwhile
+                return False
+            return True
+
+        def produce():
+            pages = iter(self.interpreter)
+            try:
+                for page in pages:
+                    if not put((InterpretedPage.from_page(page), None)):
+                        return
+                    self.produced += 1
+                put((None, None))
+            except BaseException as e:
+                put((None, e))
+            finally:
+                pages.close()
+
+        loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                (page, error) = await queue.get()
+                slots.release()
+                if error is not None:
+                    raise error
+                if page is None:
+                    return
+                yield page
+        finally:
+            stop.set()
+
+    async def _iter_processes(self):
+        loop = asyncio.get_event_loop()
+        pagenos = await loop.run_in_executor(None, self._select_pagenos)
+        if not pagenos:
+            raise EmptyDocumentError("No pages found in pdf-file")
+        options = self.interpreter._worker_options()
+        pairs = list(enumerate(pagenos))
+        chunks = deque(pairs[i:i+self.chunk_size] for i in range(0, len(pairs), self.chunk_size))
+        pending = deque()
+        try:
+            while chunks or pending:
+                while chunks and len(pending) < self.queue_size:
+                    pending.append(loop.run_in_executor(self.executor, interpret_pages, options, chunks.popleft()))
+                for page in await pending.popleft():
+                    self.produced += 1
+                    yield page
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _select_pagenos(self) -> list:
+        with open_input(self.interpreter.input_file_path) as input_file:
+            document = self.interpreter._open_document(input_file)
+            try:
+                return self.interpreter._select_pagenos(document)
+            finally:
+                document.close()
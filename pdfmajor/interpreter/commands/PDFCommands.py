@@ -1,8 +1,8 @@
 from typing import List
 
-from pdfmajor.execptions import RepeatedCommand
+from pdfmajor.execptions import RepeatedCommand, InterpreterError
 from pdfmajor.utils import MATRIX_IDENTITY, mult_matrix
-from pdfmajor.parser.PSStackParser import literal_name
+from pdfmajor.parser.PSStackParser import literal_name, KWD
 from pdfmajor.parser.PDFStream import PDFStream, list_value, dict_value
 from pdfmajor.parser.constants import LITERAL_FORM, LITERAL_IMAGE
 from .state import PDFStateStack, PDFColorSpace
@@ -11,20 +11,51 @@ from .state.Curves import CurveMethod, CurvePath, CurvePoint
 
 class PDFCommands:
     commands = {}
+    # profile name -> handlers that replace the default ones in that profile
+    profiles = {}
+    # profile name -> operator table, see get_table
+    tables = {}
 
     @classmethod
-    def __add(cls, cmd_name: str, cmd: callable):
-        if not (cmd_name in cls.commands.keys()):
-            cls.commands[cmd_name] = cmd
+    def __add(cls, cmd_name: str, cmd: callable, profile: str = None):
+        commands = cls.commands if profile is None else cls.profiles.setdefault(profile, {})
+        if not (cmd_name in commands.keys()):
+            commands[cmd_name] = cmd
+            cls.tables.clear()
             return cmd
         raise RepeatedCommand(cmd_name)
 
     @classmethod
-    def add(cls, *cmd_names: List[str]):
+    def add(cls, *cmd_names: List[str], profile: str = None):
         def wrap(cmd: callable):
             for cmd_name in cmd_names:
-                cls.__add(cmd_name, cmd)
+                cls.__add(cmd_name, cmd, profile)
             return cmd
         return wrap
 
+    @classmethod
+    def get_commands(cls, profile: str = None) -> dict:
+        """Returns the handlers used by the given profile (None for the default one)."""
+        if profile is None:
+            return cls.commands
+        if profile not in cls.profiles:
+            raise InterpreterError(f"Unknown profile {profile!r}, expected one of {sorted(cls.profiles)}")
+        commands = cls.commands.copy()
+        commands.update(cls.profiles[profile])
+        return commands
+
 
+
+    @classmethod
+    def get_table(cls, profile: str = None) -> dict:
+        """Returns the operator table of the given profile, mapping the interned
+        keyword of every operator (e.g. KWD(b'T*')) to (handler, number of args).
+        """
+        table = cls.tables.get(profile)
+        if table is None:
+            table = {}
+            for (cmd_name, cmd) in cls.get_commands(profile).items():
+                operator = cmd_name.replace('_a', '*').replace('_w', '"').replace('_q', "'")
+                table[KWD(operator.encode('latin-1'))] = (cmd, cmd.__code__.co_argcount-1)
+            cls.tables[profile] = table
+        return table
@@ -1,76 +1,147 @@
-from typing import List
+from typing import List, Iterable
 
 from pdfmajor.execptions import CommandProcessorError
 from pdfmajor.parser.PDFContentParser import PDFContentParser, PDFStream
+from pdfmajor.parser.CompiledContent import CompiledContent
 from pdfmajor.parser.PSStackParser import PSKeyword, keyword_name
-from pdfmajor.utils import get_logger
+from pdfmajor.utils import get_logger, mult_matrix, invert_matrix
 
 from .commands import PDFCommands
 from .state import PDFStateStack, PDFGraphicState, PDFTextState
 from .state.PDFGraphicState import PDFColor, PDFColorSpace, PREDEFINED_COLORSPACE
-from .state import PDFFont, get_font
+from .state import PDFFont, get_font, FontCache, DocumentFontCache
 from .state import LTTextBlock, LTCharBlock, LTChar
 from .state import LTCurve, LTLine, LTHorizontalLine, LTVerticalLine, LTRect
 from .state import LTImage
 from .state import LTXObject
+from .state import transform_items
 from .state import LTItem, LTComponent, LTContainer
-from .utils import init_resources
+from .utils import init_resources, resources_key
 
 log = get_logger('process_command_stream')
 
-def process_command_stream(streams: List[PDFStream], font_cache: dict = None, state: PDFStateStack = None):
+def process_command_stream(streams: List[PDFStream], font_cache: dict = None, state: PDFStateStack = None, profile: str = None):
+    objs = CompiledContent.load(streams, state.content_cache)
+    for item in execute_commands(objs, font_cache, state, profile):
+        yield item
+
+def execute_commands(objs: Iterable, font_cache: dict = None, state: PDFStateStack = None, profile: str = None):
+    """Runs the parsed objects of a content stream against the state and
+    yields the layout items they complete."""
     if font_cache is None:
         font_cache = {}
-    parser = PDFContentParser(streams)
-    for obj in parser:
-        if isinstance(obj, PSKeyword):
-            name = keyword_name(obj)
-            method = name.replace('*', '_a').replace('"', '_w').replace("'", '_q')
-            func = None
-            args = []
-            if method == "Do":
-                pass
-            if method in PDFCommands.commands.keys():
-                func = PDFCommands.commands.get(method)
-                nargs = func.__code__.co_argcount-1
-                if nargs:
-                    args = state.pop(nargs)
-                    if len(args) == nargs:
-                        func(state, *args)
-                    else:
-                        raise CommandProcessorError(f"Invalid Number of Args provided {method}")
-                else:
-                    func(state)
-            else:
-                log.debug('Unknown operator: %r (i.e. %r)' % (name, method))
-            # history.write(name, 
-            #     None if func is None else func.__name__
-            # , args)
+    table = PDFCommands.get_table(profile)
+    argstack = state.argstack
+    for obj in objs:
+        if not isinstance(obj, PSKeyword):
+            argstack.append(obj)
+            continue
+        entry = table.get(obj)
+        if entry is None:
+            log.debug('Unknown operator: %r', obj)
+            continue
+        (func, nargs) = entry
+        if nargs:
+            if len(argstack) < nargs:
+                raise CommandProcessorError(f"Invalid Number of Args provided {keyword_name(obj)}")
+            args = argstack[-nargs:]
+            del argstack[-nargs:]
+            func(state, *args)
         else:
-            state.argstack.append(obj)
-            # history.write('arg', None, obj)
-        
-        for complete_item in state.complete_layout_items:
-            if isinstance(complete_item, LTXObject):
-                xobj_state = prep_state(
-                    state=PDFStateStack(),
-                    ctm=complete_item.t_matrix,
-                    resources=complete_item.resources,
-                    font_cache=font_cache
-                )
-                xobj_state.graphics = state.graphics.copy()
-                for item in process_command_stream(
-                    [complete_item.stream], 
-                    font_cache=font_cache, 
-                    state=xobj_state
-                ):
-                    complete_item.add(item)
-            yield complete_item
-        state.complete_layout_items = []
+            func(state)
+        if state.complete_layout_items:
+            for item in complete_items(state, font_cache, profile):
+                yield item
+
+def complete_items(state: PDFStateStack, font_cache: dict, profile: str = None):
+    items = state.complete_layout_items
+    state.complete_layout_items = []
+    for complete_item in items:
+        if isinstance(complete_item, LTXObject):
+            complete_item.extend(interpret_form(complete_item, state, font_cache, profile))
+        yield complete_item
+
+def interpret_form(xobj: LTXObject, state: PDFStateStack, font_cache: dict, profile: str = None) -> list:
+    """Layout items of a form xobject painted from state. Forms painted
+    again with the same graphic state are replayed from state.form_cache,
+    their items moved from the ctm they were interpreted under to the new
+    one when it only differs by a translation and/or a scaling."""
+    key = form_key(xobj, state, profile)
+    cached = None
+    if key is not None:
+        cached = state.form_cache.get(key)
+        if cached is not None:
+            (ctm, items) = cached
+            if ctm == xobj.t_matrix:
+                return transform_items(items)
+            matrix = relative_matrix(ctm, xobj.t_matrix)
+            if matrix is not None:
+                return transform_items(items, matrix)
+    if 'Resources' in xobj.stream:
+        xobj_key = resources_key(xobj.stream['Resources'])
+    else:
+        # the form uses the resources of the page
+        xobj_key = state.resources_key
+    xobj_state = prep_state(
+        state=PDFStateStack(),
+        ctm=xobj.t_matrix,
+        resources=xobj.resources,
+        font_cache=font_cache,
+        content_cache=state.content_cache,
+        form_cache=state.form_cache,
+        resource_cache=state.resource_cache,
+        resources_key=xobj_key
+    )
+    xobj_state.graphics = state.graphics.copy()
+    items = list(process_command_stream(
+        [xobj.stream],
+        font_cache=font_cache,
+        state=xobj_state,
+        profile=profile
+    ))
+    if key is not None and cached is None:
+        state.form_cache.put(key, (xobj.t_matrix, transform_items(items)))
+    return items
 
-def prep_state(state: PDFStateStack, ctm: tuple, resources: dict, font_cache: dict, ignore_bad_chars: bool = False) -> PDFStateStack:
+def form_key(xobj: LTXObject, state: PDFStateStack, profile: str = None):
+    """The form stream and everything its items depend on besides the ctm,
+    None when it should not be cached."""
+    if state.form_cache is None or xobj.stream.objid is None or 'Resources' not in xobj.stream:
+        # forms without resources of their own use the ones of the page
+        return None
+    gstate = state.graphics
+    return (
+        xobj.stream.objid, xobj.stream.genno, profile,
+        gstate.linewidth, gstate.linecap, gstate.linejoin, gstate.miterlimit, repr(gstate.dash),
+        gstate.intent, gstate.flatness, repr(gstate.scolspace), repr(gstate.ncolspace),
+        repr(gstate.scolor), repr(gstate.ncolor),
+    )
+
+def relative_matrix(ctm: tuple, new_ctm: tuple):
+    """The matrix taking items under ctm to new_ctm, None unless it only
+    translates and/or scales by positive factors (lines and rectangles would
+    change kind otherwise)."""
+    inverse = invert_matrix(ctm)
+    if inverse is None:
+        return None
+    (a, b, c, d, e, f) = mult_matrix(inverse, new_ctm)
+    eps = 1e-9 * max(abs(a), abs(d), 1)
+    if abs(b) > eps or abs(c) > eps or a <= 0 or d <= 0:
+        return None
+    if abs(a-1) < 1e-12:
+        a = 1
+    if abs(d-1) < 1e-12:
+        d = 1
+    return (a, 0, 0, d, e, f)
+
+def prep_state(state: PDFStateStack, ctm: tuple, resources: dict, font_cache: dict, ignore_bad_chars: bool = False,
+               content_cache = None, form_cache = None, resource_cache = None, resources_key = None) -> PDFStateStack:
     state.t_matrix = ctm
+    state.content_cache = content_cache
+    state.form_cache = form_cache
+    state.resource_cache = resource_cache
     state.resources = resources
+    state.resources_key = resources_key if resource_cache is not None else None
     state.text.ignore_bad_chars = ignore_bad_chars
 
     # set some global states.
@@ -78,5 +149,9 @@ def prep_state(state: PDFStateStack, ctm: tuple, resources: dict, font_cache: di
     if state.colorspace_map:
         col_space = next(iter(state.colorspace_map.values()))
         state.graphics.ncolspace = state.graphics.scolspace = col_space
-    init_resources(state, font_cache)
-    return state
\ No newline at end of file
+    init_resources(state, font_cache, state.resources_key)
+    return state
+
+# resolve every operator table once, at import
+for _profile in [None] + sorted(PDFCommands.profiles):
+    PDFCommands.get_table(_profile)
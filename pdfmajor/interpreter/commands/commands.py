@@ -481,31 +481,38 @@ def insert_image(stack: PDFStateStack, obj) -> PDFStateStack:
         ))
     return stack
 
-# invoke an XObject
-@PDFCommands.add('Do')
-def insert_xobject(stack: PDFStateStack, xobjid) -> PDFStateStack:
+def insert_form_xobject(stack: PDFStateStack, xobj: PDFStream):
+    bbox = list_value(xobj['BBox'])
+    matrix = list_value(xobj.get('Matrix', MATRIX_IDENTITY))
+    # According to PDF reference 1.7 section 4.9.1, XObjects in
+    # earlier PDFs (prior to v1.2) use the page's Resources entry
+    # instead of having their own Resources entry.
+    xobjres = xobj.get('Resources')
+    resources = dict_value(xobjres) if xobjres else stack.resources.copy()
+    stack.complete_layout_items.append(make_xobject(
+        obj=xobj, 
+        bbox=bbox, 
+        ctm=stack.t_matrix, 
+        matrix=matrix, 
+        resources=resources
+    ))
+    return stack
+
+def get_xobject(stack: PDFStateStack, xobjid) -> PDFStream:
     xobjid = literal_name(xobjid)
     try:
-        xobj = PDFStream.validated_stream(stack.xobjmap[xobjid])
+        return PDFStream.validated_stream(stack.xobjmap[xobjid])
     except KeyError:
         raise InvalidOperation('Undefined xobject id: %r' % xobjid)
+
+# invoke an XObject
+@PDFCommands.add('Do')
+def insert_xobject(stack: PDFStateStack, xobjid) -> PDFStateStack:
+    xobj = get_xobject(stack, xobjid)
     # log.info('Processing xobj: %r', xobj)
     subtype = xobj.get('Subtype')
     if subtype is LITERAL_FORM and 'BBox' in xobj:
-        bbox = list_value(xobj['BBox'])
-        matrix = list_value(xobj.get('Matrix', MATRIX_IDENTITY))
-        # According to PDF reference 1.7 section 4.9.1, XObjects in
-        # earlier PDFs (prior to v1.2) use the page's Resources entry
-        # instead of having their own Resources entry.
-        xobjres = xobj.get('Resources')
-        resources = dict_value(xobjres) if xobjres else stack.resources.copy()
-        stack.complete_layout_items.append(make_xobject(
-            obj=xobj, 
-            bbox=bbox, 
-            ctm=stack.t_matrix, 
-            matrix=matrix, 
-            resources=resources
-        ))
+        insert_form_xobject(stack, xobj)
     elif subtype is LITERAL_IMAGE and 'Width' in xobj and 'Height' in xobj:
         stack.complete_layout_items.append(make_image(
             xobj,  stack.t_matrix
@@ -515,3 +522,39 @@ def insert_xobject(stack: PDFStateStack, xobjid) -> PDFStateStack:
         pass
     return stack
 
+# Text profile
+# Path construction, painting and images are skipped, every handler keeps
+# the arity of the one it replaces so the operands are still consumed.
+# The graphics state (ctm, colors, q/Q) and form xobjects are processed as
+# usual since text positions and colors depend on them.
+
+@PDFCommands.add('m', 'l', profile='text')
+def skip_point(stack: PDFStateStack, x, y) -> PDFStateStack:
+    return stack
+
+@PDFCommands.add('c', profile='text')
+def skip_curveto(stack: PDFStateStack, x1, y1, x2, y2, x3, y3) -> PDFStateStack:
+    return stack
+
+@PDFCommands.add('v', 'y', profile='text')
+def skip_partial_curveto(stack: PDFStateStack, x1, y1, x2, y2) -> PDFStateStack:
+    return stack
+
+@PDFCommands.add('re', profile='text')
+def skip_rect(stack: PDFStateStack, x, y, w, h) -> PDFStateStack:
+    return stack
+
+@PDFCommands.add('h', 'S', 'f', 'F', 'B', 'f_a', 'B_a', 's', 'b', 'b_a', 'n', profile='text')
+def skip_paint(stack: PDFStateStack) -> PDFStateStack:
+    return stack
+
+@PDFCommands.add('EI', profile='text')
+def skip_image(stack: PDFStateStack, obj) -> PDFStateStack:
+    return stack
+
+@PDFCommands.add('Do', profile='text')
+def insert_text_xobject(stack: PDFStateStack, xobjid) -> PDFStateStack:
+    xobj = get_xobject(stack, xobjid)
+    if xobj.get('Subtype') is LITERAL_FORM and 'BBox' in xobj:
+        insert_form_xobject(stack, xobj)
+    return stack
@@ -0,0 +1,164 @@
+import os
+import pickle
+import hashlib
+import tempfile
+
+from pdfmajor.utils import get_logger, LRUCache
+from pdfmajor.parser.PSStackParser import PSLiteral, PSKeyword
+from pdfmajor.parser.PDFStream import PDFStream
+from pdfmajor.parser.PDFStream.PDFObjRef import PDFObjRef
+
+log = get_logger(__name__)
+
+# bump when the font classes change in a way that invalidates stored fonts
+FONT_CACHE_VERSION = 1
+# entries of Type3 fonts that the font classes never read
+IGNORED_KEYS = set(['CharProcs', 'Resources'])
+
+def font_key(spec: dict) -> str:
+    """Content hash of a font spec and everything it references
+    (descriptor, widths, encodings, ToUnicode and embedded font streams)."""
+    digest = hashlib.sha256(b'pdfmajor-font-%d' % FONT_CACHE_VERSION)
+    visited = set()
+
+    def feed(obj):
+        if isinstance(obj, PDFObjRef):
+            if obj.objid in visited:
+                digest.update(b'<ref>')
+                return
+            visited.add(obj.objid)
+            feed(obj.resolve())
+        elif isinstance(obj, dict):
+            digest.update(b'<<')
+            for k in sorted(obj.keys(), key=str):
+                if k in IGNORED_KEYS:
+                    continue
+                digest.update(b'/%s ' % str(k).encode('utf-8', 'replace'))
+                feed(obj[k])
+            digest.update(b'>>')
+        elif isinstance(obj, (list, tuple)):
+            digest.update(b'[')
+            for v in obj:
+                feed(v)
+            digest.update(b']')
+        elif isinstance(obj, PDFStream):
+            feed(obj.attrs)
+            # prefer the raw bytes, decoding is what we want to avoid
+            if obj.rawdata is not None:
+                data = obj.rawdata
+                digest.update(b'raw %d ' % len(data))
+            else:
+                data = obj.get_data()
+                digest.update(b'data %d ' % len(data))
+            digest.update(data)
+        elif isinstance(obj, (bytes, bytearray, memoryview)):
+            digest.update(b'(%d)' % len(obj))
+            digest.update(obj)
+        elif isinstance(obj, (PSLiteral, PSKeyword)):
+            digest.update(b'%s %r ' % (type(obj).__name__.encode(), obj.name))
+        else:
+            digest.update(b'%s %r ' % (type(obj).__name__.encode(), obj))
+
+    feed(spec)
+    return digest.hexdigest()
+
+class FontCache:
+    """Content-addressed cache of parsed fonts that can be shared by documents.
+
+    Fonts are looked up by font_key(spec), first in an in-memory LRU tier
+    (max_entries fonts) and then, when a path is given, in a directory of
+    pickles that can be shared by several processes. Files are written to
+    a temporary name and renamed, so concurrent writers never leave partial
+    files behind. The directory must only be writable by trusted users
+    since its pickles are loaded as-is.
+
+    Typical usage:
+      fonts = FontCache(path="/var/cache/pdfmajor-fonts")
+      for file_path in files:
+          for page in PDFInterpreter(file_path, shared_font_cache=fonts):
+              ...
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory = LRUCache(max_entries=max_entries)
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.stores = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def __repr__(self):
+        return '<FontCache: path=%r, %r>' % (self.path, self.memory)
+
+    def __getstate__(self):
+        # each process keeps its own memory tier, only the directory is shared
+        return {'path': self.path, 'max_entries': self.max_entries}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def key(self, spec: dict) -> str:
+        return font_key(spec)
+
+    def _file_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key + '.pickle')
+
+    def get(self, key: str):
+        font = self.memory.get(key)
+        if font is not None or self.path is None:
+            return font
+        try:
+            with open(self._file_path(key), 'rb') as fp:
+                font = pickle.load(fp)
+        except FileNotFoundError:
+            self.disk_misses += 1
+            return None
+        except Exception as e:
+            log.warning('Ignoring unreadable cached font %s: %r', key, e)
+            self.disk_misses += 1
+            return None
+        self.disk_hits += 1
+        self.memory.put(key, font)
+        return font
+
+    def put(self, key: str, font):
+        """Stores a detached copy of the font, the original one may still
+        reference the objects of its document."""
+        try:
+            data = pickle.dumps(font, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            log.warning('Font %r cannot be cached: %r', font, e)
+            return
+        self.memory.put(key, pickle.loads(data))
+        self.stores += 1
+        if self.path is None:
+            return
+        file_path = self._file_path(key)
+        if os.path.exists(file_path):
+            return
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            (fd, tmp_path) = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            os.replace(tmp_path, file_path)
+        except OSError as e:
+            log.warning('Could not write cached font %s: %r', key, e)
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return
+
+    def stats(self) -> dict:
+        stats = self.memory.stats()
+        stats.update(disk_hits=self.disk_hits, disk_misses=self.disk_misses, stores=self.stores)
+        return stats
+
+class DocumentFontCache(dict):
+    """Per-document font cache (objid -> font) backed by a shared FontCache."""
+
+    def __init__(self, shared: FontCache = None):
+        dict.__init__(self)
+        self.shared = shared
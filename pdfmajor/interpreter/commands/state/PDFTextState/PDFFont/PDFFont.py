@@ -43,6 +43,12 @@ class PDFFont(object):
     def __repr__(self):
         return '<PDFFont>'
 
+    def __getstate__(self):
+        # the embedded font program is only needed while the font is built
+        state = self.__dict__.copy()
+        state.pop('fontfile', None)
+        return state
+
     def is_vertical(self):
         return False
 
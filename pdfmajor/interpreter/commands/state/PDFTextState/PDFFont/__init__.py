@@ -7,6 +7,7 @@ from pdfmajor.parser.PDFStream import resolve1
 from pdfmajor.parser.constants import LITERAL_FONT
 
 from .fonts import PDFType1Font, PDFTrueTypeFont, PDFType3Font, PDFCIDFont, PDFFont
+from .FontCache import FontCache, DocumentFontCache, font_key
 
 log = get_logger(__file__)
 
@@ -14,45 +15,57 @@ def get_font(objid: int, spec: dict, cached_fonts: dict = {}):
     if objid and objid in cached_fonts:
         font = cached_fonts[objid]
     else:
-        log.debug('get_font: create: objid=%r, spec=%r', objid, spec)
-        if settings.STRICT:
-            if spec['Type'] is not LITERAL_FONT:
-                raise FontError('Type is not /Font')
-        # Create a Font object.
-        if 'Subtype' in spec:
-            subtype = literal_name(spec['Subtype'])
-        else:
-            if settings.STRICT:
-                raise FontError('Font Subtype is not specified.')
-            subtype = 'Type1'
-        if subtype in ('Type1', 'MMType1'):
-            # Type1 Font
-            font = PDFType1Font(spec)
-        elif subtype == 'TrueType':
-            # TrueType Font
-            font = PDFTrueTypeFont(spec)
-        elif subtype == 'Type3':
-            # Type3 Font
-            font = PDFType3Font(spec)
-        elif subtype in ('CIDFontType0', 'CIDFontType2'):
-            # CID Font
-            font = PDFCIDFont(spec)
-        elif subtype == 'Type0':
-            # Type0 Font
-            dfonts = list_value(spec['DescendantFonts'])
-            assert dfonts
-            subspec = dict_value(dfonts[0]).copy()
-            for k in ('Encoding', 'ToUnicode'):
-                if k in spec:
-                    subspec[k] = resolve1(spec[k])
-            font = get_font(None, subspec, cached_fonts)
+        shared = getattr(cached_fonts, 'shared', None)
+        if shared is not None:
+            key = shared.key(spec)
+            font = shared.get(key)
+            if font is None:
+                font = create_font(objid, spec)
+                shared.put(key, font)
         else:
-            if settings.STRICT:
-                raise FontError('Invalid Font spec: %r' % spec)
-            font = PDFType1Font(spec)  # this is so wrong!
+            font = create_font(objid, spec)
         if objid:
             cached_fonts[objid] = font
     return font
 
+def create_font(objid: int, spec: dict):
+    log.debug('create_font: objid=%r, spec=%r', objid, spec)
+    if settings.STRICT:
+        if spec['Type'] is not LITERAL_FONT:
+            raise FontError('Type is not /Font')
+    # Create a Font object.
+    if 'Subtype' in spec:
+        subtype = literal_name(spec['Subtype'])
+    else:
+        if settings.STRICT:
+            raise FontError('Font Subtype is not specified.')
+        subtype = 'Type1'
+    if subtype in ('Type1', 'MMType1'):
+        # Type1 Font
+        font = PDFType1Font(spec)
+    elif subtype == 'TrueType':
+        # TrueType Font
+        font = PDFTrueTypeFont(spec)
+    elif subtype == 'Type3':
+        # Type3 Font
+        font = PDFType3Font(spec)
+    elif subtype in ('CIDFontType0', 'CIDFontType2'):
+        # CID Font
+        font = PDFCIDFont(spec)
+    elif subtype == 'Type0':
+        # Type0 Font
+        dfonts = list_value(spec['DescendantFonts'])
+        assert dfonts
+        subspec = dict_value(dfonts[0]).copy()
+        for k in ('Encoding', 'ToUnicode'):
+            if k in spec:
+                subspec[k] = resolve1(spec[k])
+        font = create_font(None, subspec)
+    else:
+        if settings.STRICT:
+            raise FontError('Invalid Font spec: %r' % spec)
+        font = PDFType1Font(spec)  # this is so wrong!
+    return font
+
 
 
@@ -1,6 +1,6 @@
 from pdfmajor.execptions import MissingFont, UnicodeNotDefined
 from pdfmajor.utils import MATRIX_IDENTITY
-from .PDFFont import PDFFont, get_font
+from .PDFFont import PDFFont, get_font, FontCache, DocumentFontCache
 
 ##  PDFTextState
 ##
@@ -5,7 +5,7 @@ from .PDFGraphicState import PDFGraphicState
 from .PDFGraphicState.PDFColor import PDFColor
 from .PDFGraphicState.PDFColorSpace import PREDEFINED_COLORSPACE, OrderedDict, PDFColorSpace
 
-from .PDFTextState import PDFTextState, PDFFont, get_font
+from .PDFTextState import PDFTextState, PDFFont, get_font, FontCache, DocumentFontCache
 
 from .Curves import CurvePath
 
@@ -16,6 +16,7 @@ from .layout import LTXObject
 from .layout import LTImage
 
 from .layout import make_char_block, make_curve, make_image, make_xobject
+from .layout import transform_items
 
 class PDFStateStack:
     def __init__(self):
@@ -30,11 +31,19 @@ class PDFStateStack:
         self.fontmap = {}
         self.xobjmap = {}
         self.resources = {}
+        # the key of resources in resource_cache, None when not cached
+        self.resources_key = None
         self.current_textblock: LTTextBlock = None
+        # compiled content streams of the document (see CompiledContent)
+        self.content_cache = None
+        # interpreted form xobjects of the document
+        self.form_cache = None
+        # resolved resource maps of the document (see init_resources)
+        self.resource_cache = None
 
     def pop(self, n: int) -> bytearray:
         if n == 0:
             return []
         x = self.argstack[-n:]
-        self.argstack = self.argstack[:-n]
+        del self.argstack[-n:]
         return x
\ No newline at end of file
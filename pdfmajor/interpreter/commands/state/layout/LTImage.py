@@ -75,5 +75,6 @@ class LTImage(LTComponent):
             elif bits == 8 and self.colorspace is LITERAL_DEVICE_GRAY:
                 BMPWriter.write_all(fp, stream, 8, width, height, width)
             else:
-                fp.write(stream.get_data())
+                for chunk in stream.iter_data():
+                    fp.write(chunk)
         return path
\ No newline at end of file
@@ -1,3 +1,4 @@
+from copy import copy
 from typing import List
 from pdfmajor.utils import apply_matrix_pt, INF, Bbox, Point, MATRIX_IDENTITY, mult_matrix
 
@@ -131,4 +132,47 @@ def make_xobject(obj, bbox, ctm, matrix, resources):
         xobj_stream=obj,
         resources=resources,
         t_matrix = ctm
-    )
\ No newline at end of file
+    )
+def transform_items(items: List[LTItem], matrix: tuple = None) -> List[LTItem]:
+    """Copies of layout items interpreted under some ctm, moved to where they
+    are under ctm x matrix. The matrix must scale by positive factors along
+    the axes and translate (lines and rectangles keep their kind), None
+    copies the items as they are."""
+    return [transform_item(item, matrix) for item in items]
+
+def transform_item(item: LTItem, matrix: tuple = None) -> LTItem:
+    obj = copy(item)
+    if isinstance(item, LTXObject):
+        # the bbox of a form only depends on its own matrix
+        obj.bbox = transform_bbox(item.bbox, None)
+        if matrix is not None:
+            obj.t_matrix = mult_matrix(item.t_matrix, matrix)
+        obj._objs = transform_items(item._objs, matrix)
+    elif type(item) is LTCurve:
+        # the bbox of free-form curves is kept in user space
+        obj.bbox = transform_bbox(item.bbox, None)
+    elif isinstance(item, LTCharBlock):
+        obj.textstate = textstate = item.textstate.copy()
+        if matrix is not None:
+            textstate.matrix = mult_matrix(textstate.matrix, matrix)
+        obj._objs = []
+        for char in item:
+            char = copy(char)
+            char.bbox = transform_bbox(char.bbox, matrix)
+            char.textstate = textstate
+            char.size = char.width if textstate.font.is_vertical() else char.height
+            obj._objs.append(char)
+        obj.bbox = transform_bbox(item.bbox, matrix)
+        obj.size = obj.width if textstate.font.is_vertical() else obj.height
+    elif isinstance(item, LTComponent):
+        obj.bbox = transform_bbox(item.bbox, matrix)
+        if isinstance(item, LTContainer):
+            obj._objs = transform_items(item._objs, matrix)
+    return obj
+
+def transform_bbox(bbox: Bbox, matrix: tuple = None) -> Bbox:
+    if matrix is None or None in (bbox.x0, bbox.y0, bbox.x1, bbox.y1):
+        return Bbox(bbox.x0, bbox.y0, bbox.x1, bbox.y1)
+    (x0, y0) = apply_matrix_pt(matrix, (bbox.x0, bbox.y0))
+    (x1, y1) = apply_matrix_pt(matrix, (bbox.x1, bbox.y1))
+    return Bbox(x0, y0, x1, y1)
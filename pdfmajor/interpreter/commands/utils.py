@@ -1,3 +1,5 @@
+from types import MappingProxyType
+
 from pdfmajor.parser.PDFParser import PDFStream
 from pdfmajor.parser.PDFStream import list_value, dict_value, resolve1
 from pdfmajor.parser.PDFStream.PDFObjRef import PDFObjRef
@@ -30,7 +32,25 @@ def get_procset(procs):
             pass
     return
 
-def init_resources(state: PDFStateStack, font_cache: dict = {}):
+def resources_key(resources):
+    """The key of resources in the resource cache: the objid of indirect
+    ones, None for direct ones (they are not cached)."""
+    if isinstance(resources, PDFObjRef):
+        return resources.objid
+    return None
+
+def init_resources(state: PDFStateStack, font_cache: dict = {}, key = None):
+    """Resolves the fonts, color spaces and xobjects of state.resources into
+    the maps of state. When a key is given (see resources_key) the maps are
+    looked up in and kept in state.resource_cache. They are then shared
+    read-only between the states, code adding to them replaces them with a
+    copy first."""
+    cache = state.resource_cache if key is not None else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            (state.fontmap, state.colorspace_map, state.xobjmap) = cached
+            return
     for (k, v) in iter(dict_value(state.resources).items()):
         # log.debug('Resource: %r: %r', k, v)
         if k == 'Font':
@@ -47,4 +67,9 @@ def init_resources(state: PDFStateStack, font_cache: dict = {}):
             get_procset(list_value(v))
         elif k == 'XObject':
             for (xobjid, xobjstrm) in iter(dict_value(v).items()):
-                state.xobjmap[xobjid] = xobjstrm
\ No newline at end of file
+                state.xobjmap[xobjid] = xobjstrm
+    if cache is not None:
+        state.fontmap = MappingProxyType(state.fontmap)
+        state.colorspace_map = MappingProxyType(state.colorspace_map)
+        state.xobjmap = MappingProxyType(state.xobjmap)
+        cache.put(key, (state.fontmap, state.colorspace_map, state.xobjmap))
\ No newline at end of file
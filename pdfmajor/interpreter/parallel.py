@@ -0,0 +1,216 @@
+import copy
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+from typing import Iterable, List, Tuple
+
+from ..parser.PDFPage import PDFPage
+from ..parser.PDFStream import PDFStream, list_value, resolve1, resolve_refs
+from ..parser.ByteSource import open_input
+from ..utils import get_logger, set_log_level
+from .PageInterpreter import PageInterpreter, InterpretedPage
+from .commands import DocumentFontCache, LTContainer, LTImage, LTXObject
+
+log = get_logger(__name__)
+
+# Per-process state. Every worker opens its own file handle and builds its
+# own PDFDocument, the font cache is warmed inside the worker and never
+# pickled across processes.
+_WORKER_STATE = {}
+
+def _document_key(options: dict) -> tuple:
+    # a ByteSource is a new object in every task, its repr names the document
+    return (repr(options['input_file_path']), options['password'], options['caching'], options['use_mmap'])
+
+def _get_worker_state(options: dict) -> dict:
+    key = _document_key(options)
+    if _WORKER_STATE.get('key') != key:
+        close_worker_state()
+        input_file = open_input(options['input_file_path'])
+        doc = PDFPage.open_document(
+            input_file,
+            password=options['password'],
+            caching=options['caching'],
+            check_extractable=False,
+            use_mmap=options['use_mmap'],
+            cache_policy=options['cache_policy'],
+            fallback=options['fallback'],
+            recovery_path=options['recovery_path'],
+            index_path=options['index_path']
+        )
+        _WORKER_STATE.update(
+            key=key,
+            input_file=input_file,
+            doc=doc,
+            font_cache=DocumentFontCache(options['shared_font_cache']),
+            pages=None,
+            pageno=-1,
+        )
+    return _WORKER_STATE
+
+def close_worker_state():
+    doc = _WORKER_STATE.get('doc')
+    if doc is not None:
+        doc.close()
+    input_file = _WORKER_STATE.get('input_file')
+    if input_file is not None:
+        input_file.close()
+    _WORKER_STATE.clear()
+
+def _get_page(state: dict, pageno: int) -> PDFPage:
+    page = PDFPage.get_page(state['doc'], pageno)
+    if page is not None:
+        return page
+    # Without a usable page index, workers keep walking the same page-tree
+    # generator (they are handed increasing page numbers) and only restart
+    # it when asked to go backwards.
+    if state['pages'] is None or pageno <= state['pageno']:
+        state['pages'] = enumerate(PDFPage.create_pages(state['doc']))
+        state['pageno'] = -1
+    for (idx, page) in state['pages']:
+        state['pageno'] = idx
+        if idx == pageno:
+            return page
+    raise IndexError(pageno)
+
+def init_worker(debug_level: int):
+    set_log_level(debug_level)
+
+def interpret_page(page: PageInterpreter, release: bool = False) -> InterpretedPage:
+    """Interprets a page into an InterpretedPage, with release what the
+    document cached for it alone is dropped afterwards."""
+    result = InterpretedPage.from_page(page)
+    if release:
+        page.release()
+    return result
+
+def interpret_pages(options: dict, pages: List[Tuple[int, int]]) -> List[InterpretedPage]:
+    """Interprets the given (page_num, pageno) pairs inside the current process.
+    """
+    state = _get_worker_state(options)
+    results = []
+    for (page_num, pageno) in pages:
+        page = PageInterpreter(
+            _get_page(state, pageno),
+            page_num,
+            state['font_cache'],
+            ignore_bad_chars=options['ignore_bad_chars'],
+            profile=options['profile']
+        )
+        result = interpret_page(page, not options['retain_pages'])
+        detach_items(result.items, {})
+        results.append(result)
+    return results
+
+def detach_items(items, streams: dict):
+    """Gives the images and forms among items (and their children) streams
+    and resources with their references resolved, one level deep: the
+    references cannot be resolved once pickled to the parent process.
+    streams maps the id of a stream to (stream, detached copy)."""
+    for item in items:
+        if isinstance(item, (LTImage, LTXObject)):
+            if id(item.stream) not in streams:
+                stream = copy.copy(item.stream)
+                stream.attrs = resolve_refs(item.stream.attrs)
+                # the original is kept so that its id is not reused
+                streams[id(item.stream)] = (item.stream, stream)
+            item.stream = streams[id(item.stream)][1]
+        if isinstance(item, LTXObject):
+            item.resources = resolve_refs(item.resources)
+        if isinstance(item, LTContainer):
+            detach_items(item, streams)
+    return
+
+def _interpret_chunk(args):
+    return interpret_pages(*args)
+
+def chunk_pages(pagenos: List[int], workers: int) -> List[List[Tuple[int, int]]]:
+    """Splits the selected page numbers into contiguous chunks, a few per worker."""
+    pairs = list(enumerate(pagenos))
+    size = max(1, -(-len(pairs) // (workers * 4)))
+    return [pairs[i:i+size] for i in range(0, len(pairs), size)]
+
+def iter_parallel_pages(options: dict, pagenos: List[int], workers: int):
+    """Interprets pages on a pool of worker processes and yields them in order.
+    """
+    chunks = chunk_pages(pagenos, workers)
+    log.info(f"Interpreting {len(pagenos)} pages in {len(chunks)} chunks on {workers} workers...")
+    with Pool(processes=workers, initializer=init_worker, initargs=(options['debug_level'],)) as pool:
+        for pages in pool.imap(_interpret_chunk, [(options, chunk) for chunk in chunks]):
+            for page in pages:
+                yield page
+
+def iter_threaded_pages(pages: Iterable[PageInterpreter], threads: int, release: bool = False):
+    """Interprets pages of one document on a pool of threads and yields
+    them in order as InterpretedPage (see interpret_page for release).
+    Pages are taken from the iterable on the calling thread, at most two
+    per thread ahead of the consumer."""
+    log.info(f"Interpreting pages on {threads} threads...")
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        try:
+            for page in pages:
+                pending.append(executor.submit(interpret_page, page, release))
+                if 2*threads <= len(pending):
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # the consumer stopped early, drop the pages not started yet
+            for future in pending:
+                future.cancel()
+
+# how often a prefetching thread waiting for room checks whether it was stopped
+PREFETCH_POLL_INTERVAL = 0.1
+
+def warm_page(page: PageInterpreter) -> PageInterpreter:
+    """Decodes the content streams of a page ahead of its interpretation
+    (its resources and fonts are set up by PageInterpreter already)."""
+    for stream in list_value(page.page.contents):
+        stream = resolve1(stream)
+        if isinstance(stream, PDFStream):
+            stream.get_data()
+    return page
+
+def iter_prefetched_pages(pages: Iterable[PageInterpreter], prefetch: int):
+    """Yields the pages in order while a background thread builds and
+    warms (see warm_page) the next ones. At most prefetch pages are held
+    ahead of the consumer, the page being built included. Closing the
+    generator stops the thread once the page it is on is done."""
+    slots = threading.Semaphore(prefetch)
+    stop = threading.Event()
+    ready = queue.Queue()
+
+    def produce():
+        try:
+            pages_left = iter(pages)
+            while True:
+                while not slots.acquire(timeout=PREFETCH_POLL_INTERVAL):
+                    if stop.is_set():
+                        return
+                if stop.is_set():
+                    return
+                page = next(pages_left, None)
+                if page is None:
+                    ready.put((None, None))
+                    return
+                ready.put((warm_page(page), None))
+        except BaseException as e:
+            ready.put((None, e))
+
+    thread = threading.Thread(target=produce, name='pdfmajor-prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            (page, error) = ready.get()
+            if error is not None:
+                raise error
+            if page is None:
+                return
+            slots.release()
+            yield page
+    finally:
+        stop.set()
+        thread.join()
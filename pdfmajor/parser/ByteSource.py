@@ -0,0 +1,277 @@
+import io
+import os
+from logging import getLogger
+from urllib.request import Request, urlopen
+
+from ..utils import LRUCache
+
+log = getLogger(__name__)
+
+##  ByteSource
+##
+class ByteSource:
+
+    """Where the bytes of a document come from, read by ranges. Subclasses
+    must be picklable, worker processes open their own copy (see open_input).
+    """
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+    def read_range(self, start: int, end: int) -> bytes:
+        """Returns the bytes in [start, end)."""
+        raise NotImplementedError
+
+    def open(self, **kwargs) -> 'RangeFile':
+        return RangeFile(self, **kwargs)
+
+class FileByteSource(ByteSource):
+
+    """A local file read by ranges, mostly to test RangeFile against."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __repr__(self):
+        return '<FileByteSource: %r>' % self.path
+
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def read_range(self, start: int, end: int) -> bytes:
+        with open(self.path, 'rb') as fp:
+            fp.seek(start)
+            return fp.read(end-start)
+
+class HTTPByteSource(ByteSource):
+
+    """A document served over http(s), read with Range requests. A server
+    ignoring them sends the whole file, which is then kept to serve the
+    other reads.
+    """
+
+    def __init__(self, url: str, headers: dict = None, timeout: float = 30):
+        self.url = url
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self._size = None
+        self._body = None
+
+    def __repr__(self):
+        return '<HTTPByteSource: %r>' % self.url
+
+    def __getstate__(self):
+        # workers fetch the file again rather than receive a copy of it
+        state = self.__dict__.copy()
+        state['_body'] = None
+        return state
+
+    def size(self) -> int:
+        if self._size is None:
+            with urlopen(Request(self.url, headers=self.headers, method='HEAD'), timeout=self.timeout) as response:
+                length = response.headers.get('Content-Length')
+            if length is None:
+                raise IOError('No Content-Length for %s' % self.url)
+            self._size = int(length)
+        return self._size
+
+    def read_range(self, start: int, end: int) -> bytes:
+        if self._body is not None:
+            return self._body[start:end]
+        headers = dict(self.headers, Range='bytes=%d-%d' % (start, end-1))
+        with urlopen(Request(self.url, headers=headers), timeout=self.timeout) as response:
+            data = response.read()
+            if response.status != 206:
+                # the server sent the whole file, keep it for the next reads
+                log.warning('Range requests not supported by %s, keeping the %d bytes it sent', self.url, len(data))
+                self._body = data
+                self._size = len(data)
+                return data[start:end]
+        if len(data) != end-start:
+            raise IOError('Short read from %s: %d bytes at %d' % (self.url, len(data), start))
+        return data
+
+##  RangeFile
+##
+class RangeFile(io.RawIOBase):
+
+    """A read-only, seekable file over a ByteSource. Blocks of block_size
+    bytes are fetched on demand, the missing blocks of a read in a single
+    range, and up to max_blocks of them are kept in an LRU cache.
+    """
+
+    def __init__(self, source: ByteSource, block_size: int = 64 << 10, max_blocks: int = 256):
+        io.RawIOBase.__init__(self)
+        self.source = source
+        self.block_size = block_size
+        self.blocks = LRUCache(max_entries=max_blocks)
+        self.length = source.size()
+        self.pos = 0
+        # range requests made and bytes they returned
+        self.requests = 0
+        self.fetched = 0
+
+    def __repr__(self):
+        return '<RangeFile: %r>' % self.source
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            pos += self.pos
+        elif whence == io.SEEK_END:
+            pos += self.length
+        if pos < 0:
+            raise ValueError('negative seek position %d' % pos)
+        self.pos = pos
+        return pos
+
+    def readinto(self, b) -> int:
+        end = min(self.pos+len(b), self.length)
+        if end <= self.pos:
+            return 0
+        data = self._read(self.pos, end)
+        b[:len(data)] = data
+        self.pos = end
+        return len(data)
+
+    def read(self, n: int = -1) -> bytes:
+        end = self.length if n is None or n < 0 else min(self.pos+n, self.length)
+        if end <= self.pos:
+            return b''
+        data = self._read(self.pos, end)
+        self.pos = end
+        return data
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def read_at(self, pos: int, n: int) -> bytes:
+        """Reads n bytes at pos without moving the position (see FileCursor)."""
+        end = min(pos+n, self.length)
+        if end <= pos:
+            return b''
+        return self._read(pos, end)
+
+    def _read(self, start: int, end: int) -> bytes:
+        first = start // self.block_size
+        last = (end-1) // self.block_size
+        blocks = [self.blocks.get(i) for i in range(first, last+1)]
+        missing = [i for (i, block) in zip(range(first, last+1), blocks) if block is None]
+        if missing:
+            # one request from the first to the last missing block
+            (lo, hi) = (missing[0], missing[-1])
+            data = self.source.read_range(lo*self.block_size, min((hi+1)*self.block_size, self.length))
+            self.requests += 1
+            self.fetched += len(data)
+            for i in range(lo, hi+1):
+                block = data[(i-lo)*self.block_size:(i-lo+1)*self.block_size]
+                self.blocks.put(i, block)
+                blocks[i-first] = block
+        data = b''.join(blocks)
+        offset = first*self.block_size
+        return data[start-offset:end-offset]
+
+    def stats(self) -> dict:
+        stats = self.blocks.stats()
+        stats.update(requests=self.requests, fetched=self.fetched)
+        return stats
+
+##  FileCursor
+##
+class FileCursor(io.RawIOBase):
+
+    """A read-only view of a file with a position of its own, so that
+    several threads can read the file at once. It reads with the file's
+    read_at (a RangeFile or another FileCursor), os.pread, a copy of a
+    BytesIO, or else a handle of its own on the file's name.
+    """
+
+    def __init__(self, fp):
+        io.RawIOBase.__init__(self)
+        self.pos = 0
+        self._own = None
+        if hasattr(fp, 'read_at'):
+            self.read_at = fp.read_at
+            self.length = fp.length
+        elif hasattr(os, 'pread') and _fileno(fp) is not None:
+            fd = _fileno(fp)
+            self.read_at = lambda pos, n: os.pread(fd, n, pos)
+            self.length = os.fstat(fd).st_size
+        elif hasattr(fp, 'getvalue'):
+            # a copy, a BytesIO with exported buffers cannot be closed
+            data = fp.getvalue()
+            self.read_at = lambda pos, n: data[pos:pos+n]
+            self.length = len(data)
+        elif isinstance(getattr(fp, 'name', None), str):
+            self._own = open(fp.name, 'rb')
+            self.length = os.fstat(self._own.fileno()).st_size
+        else:
+            raise ValueError('%r cannot be read from several threads' % fp)
+
+    def __repr__(self):
+        return '<FileCursor: pos=%d, length=%d>' % (self.pos, self.length)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            pos += self.pos
+        elif whence == io.SEEK_END:
+            pos += self.length
+        if pos < 0:
+            raise ValueError('negative seek position %d' % pos)
+        self.pos = pos
+        return pos
+
+    def read_at(self, pos: int, n: int) -> bytes:
+        # only used with a handle of our own, the other cases replace it
+        self._own.seek(pos)
+        return self._own.read(n)
+
+    def read(self, n: int = -1) -> bytes:
+        if n is None or n < 0:
+            n = max(0, self.length-self.pos)
+        data = self.read_at(self.pos, n)
+        self.pos += len(data)
+        return data
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if self._own is not None:
+            self._own.close()
+            self._own = None
+        io.RawIOBase.close(self)
+
+def _fileno(fp):
+    try:
+        return fp.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def open_input(input_file, **kwargs):
+    """Opens a local path, an http(s) URL or a ByteSource for reading, the
+    remote ones through a RangeFile (kwargs are its block settings)."""
+    if isinstance(input_file, ByteSource):
+        return input_file.open(**kwargs)
+    if isinstance(input_file, str) and input_file.startswith(('http://', 'https://')):
+        return HTTPByteSource(input_file).open(**kwargs)
+    return open(input_file, 'rb')
@@ -0,0 +1,163 @@
+import sys
+from array import array
+from typing import List, Iterable
+
+from .PDFContentParser import PDFContentParser
+from .PDFStream import PDFStream
+from .PSStackParser import PSKeyword
+
+# operand kinds
+INT = 0
+FLOAT = 1
+OBJECT = 2
+# integers that a double holds exactly
+MAX_PACKED_INT = 1 << 53
+# what the cache holds for streams used once, they are compiled on the second use
+SEEN = object()
+
+##  CompiledContent
+##
+class CompiledContent(object):
+
+    """Parsed content streams in a compact form that can be replayed
+    without tokenizing them again.
+
+    The operators are an array of indexes into the distinct keywords of
+    the streams, each with its number of operands. The operands are
+    packed by kind: numbers in an array of doubles, everything else
+    (strings, names, arrays, dictionaries, inline images) in a list.
+    Iterating yields the same objects as PDFContentParser.
+
+    Typical usage:
+      content = CompiledContent.load(streams, document.content_cache)
+      for obj in content:
+          ...
+    """
+
+    def __init__(self):
+        self.keywords: List[PSKeyword] = []
+        self.ops = array('I')
+        self.nargs = array('I')
+        self.kinds = bytearray()
+        self.numbers = array('d')
+        self.objects = []
+        # operands left after the last operator
+        self.trailing = 0
+        self.nbytes = 0
+
+    def __repr__(self):
+        return '<CompiledContent: ops=%d, operands=%d, bytes=%d>' % (len(self.ops), len(self.kinds), self.nbytes)
+
+    def __len__(self):
+        return len(self.ops)
+
+    @classmethod
+    def compile(cls, streams: List[PDFStream]) -> 'CompiledContent':
+        content = cls()
+        opcodes = {}
+        (ops, nargs, kinds, numbers, objects) = (
+            content.ops, content.nargs, content.kinds, content.numbers, content.objects
+        )
+        count = 0
+        for obj in PDFContentParser(streams):
+            if isinstance(obj, PSKeyword):
+                opcode = opcodes.get(obj)
+                if opcode is None:
+                    opcode = opcodes[obj] = len(content.keywords)
+                    content.keywords.append(obj)
+                ops.append(opcode)
+                nargs.append(count)
+                count = 0
+                continue
+            count += 1
+            kind = type(obj)
+            if kind is int and -MAX_PACKED_INT <= obj <= MAX_PACKED_INT:
+                kinds.append(INT)
+                numbers.append(obj)
+            elif kind is float:
+                kinds.append(FLOAT)
+                numbers.append(obj)
+            else:
+                kinds.append(OBJECT)
+                objects.append(obj)
+        content.trailing = count
+        content.nbytes = content.estimate_size()
+        return content
+
+    def estimate_size(self) -> int:
+        size = sys.getsizeof(self.keywords) + sys.getsizeof(self.objects)
+        for arr in (self.ops, self.nargs, self.kinds, self.numbers):
+            size += sys.getsizeof(arr)
+        for obj in self.objects:
+            size += sys.getsizeof(obj)
+            if isinstance(obj, (list, dict)):
+                size += sum(sys.getsizeof(v) for v in obj)
+            elif isinstance(obj, PDFStream) and obj.rawdata is not None:
+                size += len(obj.rawdata)
+        return size
+
+    def __iter__(self):
+        (keywords, kinds, numbers, objects) = (self.keywords, self.kinds, self.numbers, self.objects)
+        (k, n, o) = (0, 0, 0)
+        for (opcode, count) in zip(self.ops, self.nargs):
+            for kind in kinds[k:k+count]:
+                if kind == INT:
+                    yield int(numbers[n])
+                    n += 1
+                elif kind == FLOAT:
+                    yield numbers[n]
+                    n += 1
+                else:
+                    yield objects[o]
+                    o += 1
+            k += count
+            yield keywords[opcode]
+        for kind in kinds[k:]:
+            if kind == OBJECT:
+                yield objects[o]
+                o += 1
+            else:
+                yield int(numbers[n]) if kind == INT else numbers[n]
+                n += 1
+
+    @staticmethod
+    def key(streams: List[PDFStream]) -> tuple:
+        """Identifies the streams by objid/genno, None when one of them is
+        not an indirect object (those are not cached)."""
+        key = []
+        for strm in map(PDFStream.validated_stream, streams):
+            if strm.objid is None:
+                return None
+            key.append((strm.objid, strm.genno))
+        return tuple(key)
+
+    @classmethod
+    def load(cls, streams: List[PDFStream], cache=None) -> Iterable:
+        """Returns the compiled streams from the cache. Most page streams are
+        read once, so the first use only leaves a mark in the cache and the
+        streams are compiled (and cached) on the second one. Contents larger
+        than the whole budget of the cache are not kept. Otherwise, without
+        a cache, or when a stream is large enough to be decoded while parsed,
+        this is a plain PDFContentParser."""
+        streams = [PDFStream.validated_stream(strm) for strm in streams]
+        if cache is None or any(
+            strm.data is None and strm.rawdata is not None and len(strm.rawdata) >= strm.streaming_min_size
+            for strm in streams
+        ):
+            return PDFContentParser(streams)
+        key = cls.key(streams)
+        if key is None:
+            return PDFContentParser(streams)
+        content = cache.get(key)
+        if content is None:
+            size = sys.getsizeof(key)
+            if not cache.max_bytes or size <= cache.max_bytes:
+                cache.put(key, SEEN, size=size)
+            return PDFContentParser(streams)
+        if content is SEEN:
+            content = cls.compile(streams)
+            if not cache.max_bytes or content.nbytes <= cache.max_bytes:
+                cache.put(key, content, size=content.nbytes)
+            else:
+                cache.pop(key)
+        return content
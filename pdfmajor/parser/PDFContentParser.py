@@ -1,23 +1,64 @@
 import re
-import operator
 
 from typing import List
-from io import BytesIO
 
 from pdfmajor.execptions import PSEOF, PSTypeError
-from ..utils import int2byte, choplist, settings
+from ..utils import choplist, settings
 
-from .PSStackParser import literal_name
+from .PSStackParser import literal_name, PSLiteral
 from .PSStackParser import PSStackParser
 from .PSStackParser import KWD
 
 from .PDFStream import PDFStream
 
+# EI not followed by anything but whitespace
+INLINE_IMAGE_EI = re.compile(br'EI(?!\S)')
+INLINE_IMAGE_END = re.compile(br'\s*EI(?!\S)')
+INLINE_IMAGE_TAIL = b'EI'
+# components of the color spaces allowed in inline images
+INLINE_IMAGE_COMPONENTS = {
+    'G': 1, 'DeviceGray': 1,
+    'RGB': 3, 'DeviceRGB': 3,
+    'CMYK': 4, 'DeviceCMYK': 4,
+    'I': 1, 'Indexed': 1,
+}
+
+def inline_image_size(attrs: dict):
+    """Size of the data of an unfiltered inline image, None when unknown."""
+    if 'F' in attrs or 'Filter' in attrs:
+        return None
+    width = attrs.get('W', attrs.get('Width'))
+    height = attrs.get('H', attrs.get('Height'))
+    if attrs.get('IM', attrs.get('ImageMask')):
+        (ncomponents, bits) = (1, 1)
+    else:
+        bits = attrs.get('BPC', attrs.get('BitsPerComponent'))
+        colorspace = attrs.get('CS', attrs.get('ColorSpace'))
+        if isinstance(colorspace, list) and colorspace:
+            # [/Indexed base hival lookup]
+            colorspace = colorspace[0]
+        if not isinstance(colorspace, PSLiteral):
+            # a named color space of the resources
+            return None
+        ncomponents = INLINE_IMAGE_COMPONENTS.get(literal_name(colorspace))
+    if not all(isinstance(v, int) and 0 < v for v in (width, height, bits, ncomponents)):
+        return None
+    return height * ((width*ncomponents*bits + 7) // 8)
+
+def strip_eol(data):
+    """Drops the end of line before EI."""
+    if data[-2:] == b'\r\n':
+        return data[:-2]
+    if data[-1:] in (b'\r', b'\n'):
+        return data[:-1]
+    return data
+
 class PDFContentParser(PSStackParser):
 
     def __init__(self, streams: List[PDFStream]):
         self.streams = streams
         self.istream = 0
+        self.data = None
         PSStackParser.__init__(self, None)
         return
 
@@ -28,7 +69,9 @@ class PDFContentParser(PSStackParser):
                 self.istream += 1
             else:
                 raise PSEOF('Unexpected EOF, file truncated?')
-            self.fp = BytesIO(strm.get_data())
+            self.fp = strm.open_data()
+            # the whole decoded stream, None when it is decoded while read
+            self.data = None if strm.data is None else memoryview(strm.data)
         return
 
     def seek(self, pos):
@@ -49,36 +92,88 @@ class PDFContentParser(PSStackParser):
         self.charpos = 0
         return
 
-    def get_inline_data(self, pos, target=b'EI'):
+    def get_inline_data(self, pos, attrs: dict = None):
+        """Returns the data of an inline image starting at pos, up to its EI
+        operator. The end is taken from the size of the image when attrs
+        declare it (unfiltered images), otherwise searched for. The data is
+        a memoryview over the content stream unless it is decoded while
+        being read."""
         self.seek(pos)
-        i = 0
-        data = b''
-        while i <= len(target):
-            self.fillbuf()
-            if i:
-                c = operator.getitem(self.buf,self.charpos)
-                c = int2byte(c)
-                data += c
-                self.charpos += 1
-                if len(target) <= i and c.isspace():
-                    i += 1
-                elif i < len(target) and c == (int2byte(target[i])):
-                    i += 1
-                else:
-                    i = 0
-            else:
-                try:
-                    j = self.buf.index(target[0], self.charpos)
-                    data += self.buf[self.charpos:j+1]
-                    self.charpos = j+1
-                    i = 1
-                except ValueError:
-                    data += self.buf[self.charpos:]
-                    self.charpos = len(self.buf)
-        data = data[:-(len(target)+1)]  # strip the last part
-        data = re.sub(br'(\x0d\x0a|[\x0d\x0a])$', b'', data)
+        size = inline_image_size(attrs) if attrs else None
+        if self.data is None:
+            return (pos, self.find_inline_data(pos, size))
+        m = None
+        if size is not None:
+            m = INLINE_IMAGE_END.match(self.data, pos+size)
+        if m is None:
+            m = INLINE_IMAGE_EI.search(self.data, pos)
+            if m is None:
+                # continued in the next stream
+                return (pos, self.find_inline_data(pos))
+            data = strip_eol(self.data[pos:m.start()])
+        else:
+            data = self.data[pos:pos+size]
+        # skip the whitespace after EI
+        PSStackParser.seek(self, min(m.end()+1, len(self.data)))
         return (pos, data)
 
+    def find_inline_data(self, pos, size: int = None) -> bytes:
+        """Same as get_inline_data, buffer by buffer."""
+        if size is not None:
+            fp = self.fp
+            data = self.read_inline_data(size)
+            if data is not None:
+                return data
+            if self.fp is not fp:
+                raise PSEOF('Unexpected EOF, file truncated?')
+            self.seek(pos)
+        chunks = []
+        carry = b''
+        while True:
+            try:
+                self.fillbuf()
+            except PSEOF:
+                # EI ends the last stream
+                if carry != INLINE_IMAGE_TAIL:
+                    raise
+                return strip_eol(b''.join(chunks))
+            window = carry + self.buf[self.charpos:]
+            self.charpos = len(self.buf)
+            m = INLINE_IMAGE_EI.search(window)
+            # EI at the end of the window may still be followed by more data
+            if m is not None and m.end() < len(window):
+                chunks.append(window[:m.start()])
+                self.charpos -= len(window) - m.end() - 1
+                return strip_eol(b''.join(chunks))
+            chunks.append(window[:-len(INLINE_IMAGE_TAIL)])
+            carry = window[-len(INLINE_IMAGE_TAIL):]
+
+    def read_inline_data(self, size: int) -> bytes:
+        """Reads size bytes, None unless they are followed by EI."""
+        chunks = []
+        window = b''
+        try:
+            while size:
+                self.fillbuf()
+                chunk = self.buf[self.charpos:self.charpos+size]
+                chunks.append(chunk)
+                self.charpos += len(chunk)
+                size -= len(chunk)
+            # whitespace, EI and what follows it
+            while len(window.lstrip()) < len(INLINE_IMAGE_TAIL)+1:
+                self.fillbuf()
+                window += self.buf[self.charpos:]
+                self.charpos = len(self.buf)
+        except PSEOF:
+            if INLINE_IMAGE_END.fullmatch(window) is None:
+                return None
+            return b''.join(chunks)
+        m = INLINE_IMAGE_END.match(window)
+        if m is None:
+            return None
+        self.charpos -= len(window) - m.end() - 1
+        return b''.join(chunks)
+
     def flush(self):
         self.add_results(*self.popall())
         return
@@ -97,7 +192,7 @@ class PDFContentParser(PSStackParser):
                 if len(objs) % 2 != 0:
                     raise PSTypeError('Invalid dictionary construct: %r' % objs)
                 d = dict((literal_name(k), v) for (k, v) in choplist(2, objs))
-                (pos, data) = self.get_inline_data(pos+len(b'ID '))
+                (pos, data) = self.get_inline_data(pos+len(b'ID '), d)
                 obj = PDFStream(d, data)
                 self.push((pos, obj))
                 self.push((pos, self.KEYWORD_EI))
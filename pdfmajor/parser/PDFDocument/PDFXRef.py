@@ -1,13 +1,20 @@
+import os
 import re
+import sys
+import json
+import hashlib
+from array import array
+from bisect import bisect_left
 from logging import getLogger
 from typing import Tuple, Optional, Dict
 
-from pdfmajor.execptions import PSEOF, PDFSyntaxError
+from pdfmajor.execptions import PSEOF, PSSyntaxError, PDFSyntaxError, PDFNoValidXRef
 
-from ...utils import settings, choplist, nunpack
-from ..PSStackParser import KWD
+from ...utils import settings, choplist
+from ..PSStackParser import KWD, LIT, PSLiteral
 from ..PDFParser import PDFStreamParser
 from ..PDFStream import PDFStream
+from ..PDFStream.PDFObjRef import PDFObjRef
 from ..PDFStream import dict_value
 
 from .constants import LITERAL_OBJSTM, LITERAL_XREF
@@ -26,6 +33,13 @@ class PDFBaseXRef(object):
     def get_objids(self):
         return []
 
+    # objids marked free (deleted) by this section
+    def get_free_objids(self):
+        return []
+
+    def is_free(self, objid) -> bool:
+        return False
+
     # Must return
     #     (strmid, index, genno)
     #  or (None, pos, genno)
@@ -39,6 +53,7 @@ class PDFXRef(PDFBaseXRef):
 
     def __init__(self):
         self.offsets: Dict[int, Pos] = {}
+        self.free = set()
         self.trailer = {}
         return
 
@@ -75,6 +90,7 @@ class PDFXRef(PDFBaseXRef):
                     raise PDFNoValidXRef('Invalid XRef format: %r, line=%r' % (parser, line))
                 (pos, genno, use) = f
                 if use != b'n':
+                    self.free.add(objid)
                     continue
                 self.offsets[objid] = (None, int(pos), int(genno))
         log.info('xref objects: %r', self.offsets)
@@ -101,6 +117,12 @@ class PDFXRef(PDFBaseXRef):
     def get_objids(self):
         return iter(self.offsets.keys())
 
+    def get_free_objids(self):
+        return iter(self.free)
+
+    def is_free(self, objid) -> bool:
+        return objid in self.free
+
     def get_pos(self, objid):
         try:
             return self.offsets[objid]
@@ -110,67 +132,223 @@ class PDFXRef(PDFBaseXRef):
 
 ##  PDFXRefFallback
 ##
+# "N G obj" and "trailer" at the start of a line, /Type /ObjStm anywhere
+RECOVERY_MARKERS = re.compile(
+    br'(?:(?<=[\r\n])|^)(?:(\d+)\s+(\d+)\s+obj\b|(trailer)\b)|(/Type\s*/ObjStm\b)'
+)
+RECOVERY_CHUNK = 1 << 24
+# longest marker found across two chunks
+RECOVERY_OVERLAP = 1 << 10
+RECOVERY_FORMAT = 'pdfmajor-recovery'
+RECOVERY_VERSION = 1
+
+def iter_recovery_markers(parser, chunk: int = RECOVERY_CHUNK):
+    """Yields (pos, objid, genno, kind) for every marker of the file, kind
+    being 'obj', 'trailer' or 'objstm'. The raw bytes are scanned with one
+    regex, the memory map at once or the file chunk by chunk."""
+    if parser._map is not None:
+        chunks = [(0, parser._map, 0, len(parser._map))]
+    else:
+        chunks = _iter_recovery_chunks(parser.fp, chunk)
+    for (offset, buf, start, end) in chunks:
+        for m in RECOVERY_MARKERS.finditer(buf, start):
+            if end <= m.start():
+                break
+            pos = offset+m.start()
+            if m.group(1) is not None:
+                yield (pos, int(m.group(1)), int(m.group(2)), 'obj')
+            elif m.group(3) is not None:
+                yield (pos, None, None, 'trailer')
+            else:
+                yield (pos, None, None, 'objstm')
+    return
+
+def _iter_recovery_chunks(fp, chunk: int):
+    """Yields (offset, buf, start, end): buf holds the file from offset and
+    overlaps its neighbours, the markers starting in buf[start:end] are the
+    ones of this chunk."""
+    base = 0
+    while True:
+        offset = max(0, base-RECOVERY_OVERLAP)
+        # the consumer moves the file between chunks
+        fp.seek(offset)
+        buf = fp.read(base-offset+chunk+RECOVERY_OVERLAP)
+        if len(buf) <= base-offset:
+            return
+        yield (offset, buf, base-offset, base-offset+chunk)
+        base += chunk
+
+def file_fingerprint(parser, size: int = 1 << 16) -> dict:
+    """Size of the file and a hash of its first and last bytes."""
+    if parser._map is not None:
+        total = len(parser._map)
+        (head, tail) = (parser._map[:size], parser._map[max(0, total-size):])
+    else:
+        fp = parser.fp
+        total = fp.seek(0, 2)
+        fp.seek(0)
+        head = fp.read(size)
+        fp.seek(max(0, total-size))
+        tail = fp.read(size)
+    return {'size': total, 'digest': hashlib.sha1(bytes(head)+bytes(tail)).hexdigest()}
+
 class PDFXRefFallback(PDFXRef):
 
+    """Object table recovered by scanning the whole file for "N G obj" lines,
+    used when the xref tables are missing or broken. Objects stored in
+    object streams are listed from the headers of those streams, trailers
+    are merged in file order.
+    """
+
+    def __init__(self):
+        PDFXRef.__init__(self)
+        # positions of the trailer keywords
+        self.trailer_positions = []
+        return
+
     def __repr__(self):
         return '<PDFXRefFallback: offsets=%r>' % (self.offsets.keys())
 
-    PDFOBJ_CUE = re.compile(r'^(\d+)\s+(\d+)\s+obj\b')
-
     def load(self, parser):
-        parser.seek(0)
-        while 1:
+        last_obj = None
+        for (pos, objid, genno, kind) in iter_recovery_markers(parser):
+            if kind == 'obj':
+                self.offsets[objid] = (None, pos, genno)
+                last_obj = (pos, objid, genno)
+            elif kind == 'trailer':
+                self.trailer_positions.append(pos)
+            elif last_obj is not None:
+                self.load_objstm(parser, *last_obj)
+                # a stream dictionary has a single /Type
+                last_obj = None
+        self.load_trailers(parser)
+        log.info('recovered objects: %d', len(self.offsets))
+        return
+
+    def load_objstm(self, parser, pos, objid, genno):
+        """Lists the members of the object stream at pos from its header."""
+        try:
+            parser.seek(pos)
+            (_, obj) = parser.nextobject()
+        except (PSEOF, PDFSyntaxError, PSSyntaxError):
+            return
+        if not isinstance(obj, PDFStream) or obj.get('Type') is not LITERAL_OBJSTM:
+            return
+        obj.set_objid(objid, genno)
+        try:
+            n = obj['N']
+        except KeyError:
+            if settings.STRICT:
+                raise PDFSyntaxError('N is not defined: %r' % obj)
+            n = 0
+        parser1 = PDFStreamParser(obj.get_data())
+        header = []
+        try:
+            while len(header) < 2*n:
+                (_, token) = parser1.nexttoken()
+                header.append(token)
+        except PSEOF:
+            pass
+        for index in range(len(header)//2):
+            self.offsets[header[index*2]] = (objid, index, 0)
+        return
+
+    def load_trailers(self, parser):
+        for pos in self.trailer_positions:
             try:
-                (pos, line) = parser.nextline()
-            except PSEOF:
-                break
-            if line.startswith(b'trailer'):
                 parser.seek(pos)
                 self.load_trailer(parser)
-                log.info('trailer: %r', self.trailer)
-                break
-            line=line.decode('latin-1') #default pdf encoding
-            m = self.PDFOBJ_CUE.match(line)
-            if not m:
+            except (PSEOF, PDFSyntaxError, PSSyntaxError, PDFNoValidXRef, AssertionError):
                 continue
-            (objid, genno) = m.groups()
-            objid = int(objid)
-            genno = int(genno)
-            self.offsets[objid] = (None, pos, genno)
-            # expand ObjStm.
-            parser.seek(pos)
-            (_, obj) = parser.nextobject()
-            if isinstance(obj, PDFStream) and obj.get('Type') is LITERAL_OBJSTM:
-                stream = PDFStream.validated_stream(obj)
-                try:
-                    n = stream['N']
-                except KeyError:
-                    if settings.STRICT:
-                        raise PDFSyntaxError('N is not defined: %r' % stream)
-                    n = 0
-                parser1 = PDFStreamParser(stream.get_data())
-                objs = []
-                try:
-                    while 1:
-                        (_, obj) = parser1.nextobject()
-                        objs.append(obj)
-                except PSEOF:
-                    pass
-                n = min(n, len(objs)//2)
-                for index in range(n):
-                    objid1 = objs[index*2]
-                    self.offsets[objid1] = (objid, index, 0)
+        log.info('trailer: %r', self.trailer)
+        return
+
+    def save(self, path: str, parser):
+        """Writes the recovered table to path, see load_saved."""
+        saved = dict(
+            format=RECOVERY_FORMAT,
+            version=RECOVERY_VERSION,
+            trailers=self.trailer_positions,
+            offsets=[[objid, strmid, index, genno] for (objid, (strmid, index, genno)) in self.offsets.items()],
+            **file_fingerprint(parser)
+        )
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'w') as fp:
+            json.dump(saved, fp, separators=(',', ':'))
+        os.replace(tmp_path, path)
         return
 
+    def load_saved(self, path: str, parser) -> bool:
+        """Loads a table written by save, False when there is none or it was
+        saved for another file."""
+        try:
+            with open(path) as fp:
+                saved = json.load(fp)
+        except (OSError, ValueError):
+            return False
+        if (
+            not isinstance(saved, dict) or
+            saved.get('format') != RECOVERY_FORMAT or
+            saved.get('version') != RECOVERY_VERSION or
+            any(saved.get(k) != v for (k, v) in file_fingerprint(parser).items())
+        ):
+            return False
+        self.offsets = {objid: (strmid, index, genno) for (objid, strmid, index, genno) in saved['offsets']}
+        self.trailer_positions = saved['trailers']
+        self.load_trailers(parser)
+        return True
+
 ##  PDFXRefStream
 ##
+def _padded_typecode(width: int):
+    """Returns (padded width, typecode) of the array that can hold a field."""
+    for (padded, typecode) in ((1, 'B'), (2, 'H'), (4, 'I'), (4, 'L'), (8, 'Q')):
+        if width <= padded and array(typecode).itemsize == padded:
+            return (padded, typecode)
+    return (None, None)
+
+def unpack_column(data: bytes, offset: int, width: int, entlen: int, nrows: int, default: int = 0):
+    """Decodes one big-endian field of every xref-stream entry at once.
+
+    The bytes of the field are copied with extended slices into a buffer
+    padded to the item size of an array typecode, which is then read in
+    one go (and byte-swapped on little-endian machines).
+    """
+    if width == 0:
+        return array('B', [default]) * nrows if default < 256 else [default] * nrows
+    (padded, typecode) = _padded_typecode(width)
+    if typecode is None:
+        # wider than 8 bytes, not worth vectorizing
+        return [
+            int.from_bytes(data[i:i+width], 'big')
+            for i in range(offset, offset+nrows*entlen, entlen)
+        ]
+    end = nrows*entlen
+    buf = bytearray(nrows*padded)
+    for k in range(width):
+        buf[padded-width+k::padded] = data[offset+k:end:entlen]
+    column = array(typecode)
+    column.frombytes(buf)
+    if sys.byteorder == 'little' and padded > 1:
+        column.byteswap()
+    return column
+
 class PDFXRefStream(PDFBaseXRef):
 
+    """XRef stream decoded into three columns (type, field2, field3) with an
+    objid -> row index, so every lookup is a couple of array accesses.
+    """
+
+    # when the objids are this sparse the row index becomes a dict
+    DENSE_INDEX_RATIO = 4
+
     def __init__(self):
         self.data = None
         self.entlen = None
         self.fl1 = self.fl2 = self.fl3 = None
         self.ranges = []
+        self.types = self.fields2 = self.fields3 = None
+        self.rows = None
         return
 
     def __repr__(self):
@@ -189,46 +367,304 @@ class PDFXRefStream(PDFBaseXRef):
             raise PDFSyntaxError('Invalid index number')
         self.ranges.extend(choplist(2, index_array))
         (self.fl1, self.fl2, self.fl3) = stream['W']
-        self.data = stream.get_data()
         self.entlen = self.fl1+self.fl2+self.fl3
         self.trailer = stream.attrs
+        self.decode(stream.get_data())
         log.info('xref stream: objid=%s, fields=%d,%d,%d',
                  ', '.join(map(repr, self.ranges)),
                  self.fl1, self.fl2, self.fl3)
         return
 
+    def decode(self, data: bytes):
+        """Unpacks the entries into columns and builds the objid -> row index."""
+        nrows = sum(nobjs for (_, nobjs) in self.ranges)
+        if self.entlen:
+            nrows = min(nrows, len(data)//self.entlen)
+        else:
+            nrows = 0
+        self.types = unpack_column(data, 0, self.fl1, self.entlen, nrows, default=1)
+        self.fields2 = unpack_column(data, self.fl1, self.fl2, self.entlen, nrows)
+        self.fields3 = unpack_column(data, self.fl1+self.fl2, self.fl3, self.entlen, nrows)
+        maxid = max([start+nobjs for (start, nobjs) in self.ranges] or [0])
+        if maxid <= self.DENSE_INDEX_RATIO*max(nrows, 1):
+            rows = array('l', [-1]) * maxid
+        else:
+            rows = {}
+        # the first range listing an objid wins, so fill them backwards.
+        bases = []
+        base = 0
+        for (start, nobjs) in self.ranges:
+            bases.append(base)
+            base += nobjs
+        for ((start, nobjs), base) in reversed(list(zip(self.ranges, bases))):
+            count = max(0, min(nobjs, nrows-base))
+            if isinstance(rows, dict):
+                rows.update(zip(range(start, start+count), range(base, base+count)))
+            elif count:
+                rows[start:start+count] = array('l', range(base, base+count))
+        self.rows = rows
+        return
+
     def get_trailer(self):
         return self.trailer
 
     def get_objids(self):
+        types = self.types
+        base = 0
         for (start, nobjs) in self.ranges:
-            for i in range(nobjs):
-                offset = self.entlen * i
-                ent = self.data[offset:offset+self.entlen]
-                f1 = nunpack(ent[:self.fl1], 1)
-                if f1 == 1 or f1 == 2:
+            for i in range(min(nobjs, len(types)-base)):
+                if types[base+i] in (1, 2):
                     yield start+i
+            base += nobjs
         return
 
-    def get_pos(self, objid):
-        index = 0
+    def get_free_objids(self):
+        types = self.types
+        base = 0
         for (start, nobjs) in self.ranges:
-            if start <= objid and objid < start+nobjs:
-                index += objid - start
-                break
-            else:
-                index += nobjs
-        else:
+            for i in range(min(nobjs, len(types)-base)):
+                if types[base+i] == 0:
+                    yield start+i
+            base += nobjs
+        return
+
+    def is_free(self, objid) -> bool:
+        try:
+            return self.types[self.get_row(objid)] == 0
+        except KeyError:
+            return False
+
+    def get_row(self, objid: int) -> int:
+        try:
+            row = self.rows[objid]
+        except (IndexError, KeyError, TypeError):
             raise KeyError(objid)
-        offset = self.entlen * index
-        ent = self.data[offset:offset+self.entlen]
-        f1 = nunpack(ent[:self.fl1], 1)
-        f2 = nunpack(ent[self.fl1:self.fl1+self.fl2])
-        f3 = nunpack(ent[self.fl1+self.fl2:])
+        if row < 0 or objid < 0:
+            raise KeyError(objid)
+        return row
+
+    def get_pos(self, objid):
+        row = self.get_row(objid)
+        f1 = self.types[row]
         if f1 == 1:
-            return (None, f2, f3)
+            return (None, self.fields2[row], self.fields3[row])
         elif f1 == 2:
-            return (f2, f3, 0)
+            return (self.fields2[row], self.fields3[row], 0)
         else:
             # this is a free object
             raise KeyError(objid)
+
+
+##  PDFXRefIndex
+##
+INDEX_FORMAT = 'pdfmajor-index'
+INDEX_VERSION = 3
+
+def dump_object(obj, get_genno):
+    """obj (a trailer value) as plain JSON data, references as [objid, genno]
+    pairs, see load_object."""
+    if isinstance(obj, PDFObjRef):
+        return {'ref': [obj.objid, get_genno(obj.objid)]}
+    elif isinstance(obj, PSLiteral):
+        if isinstance(obj.name, bytes):
+            return {'name_hex': obj.name.hex()}
+        return {'name': obj.name}
+    elif isinstance(obj, bytes):
+        return {'hex': obj.hex()}
+    elif isinstance(obj, dict):
+        return {'dict': {k: dump_object(v, get_genno) for (k, v) in obj.items()}}
+    elif isinstance(obj, list):
+        return [dump_object(v, get_genno) for v in obj]
+    elif obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    raise TypeError('Cannot save %r in an index' % (obj,))
+
+def load_object(data):
+    """Rebuilds what dump_object wrote, the references have no document yet."""
+    if isinstance(data, list):
+        return [load_object(v) for v in data]
+    elif isinstance(data, dict):
+        if 'ref' in data:
+            (objid, genno) = data['ref']
+            return PDFObjRef(None, int(objid), int(genno))
+        elif 'name' in data:
+            return LIT(data['name'])
+        elif 'name_hex' in data:
+            return LIT(bytes.fromhex(data['name_hex']))
+        elif 'hex' in data:
+            return bytes.fromhex(data['hex'])
+        return {k: load_object(v) for (k, v) in data['dict'].items()}
+    return data
+
+def file_mtime(parser) -> Optional[int]:
+    try:
+        return os.fstat(parser.fp.fileno()).st_mtime_ns
+    except (AttributeError, OSError):
+        return None
+
+class PDFXRefIndex(PDFBaseXRef):
+
+    """The xref sections of a document merged into one sorted table: the
+    newest section listing an objid wins, as an offset, an object stream
+    member or a free entry. It can be saved next to the file (see save)
+    with its trailer, page objids and fallback flag, so reopening it reads
+    no xref at all.
+    """
+
+    # strmid of the free entries
+    FREE = -2
+
+    def __init__(self):
+        self.objids = array('q')
+        # strmid, -1 for objects at an offset or FREE, index or offset, genno
+        self.strmids = array('q')
+        self.fields = array('q')
+        self.gennos = array('q')
+        self.trailer = {}
+        self.page_objids = None
+        self.fallback = False
+        return
+
+    def __repr__(self):
+        return '<PDFXRefIndex: objects=%d>' % len(self.objids)
+
+    @classmethod
+    def build(cls, xrefs, page_objids=None, fallback=False):
+        """Merges xrefs, given newest first as PDFDocument reads them. The
+        xref stream of a hybrid-reference file belongs to the revision of
+        the table naming it, the objects it lists are free in that table."""
+        revisions = []
+        for (i, xref) in enumerate(xrefs):
+            if i and isinstance(xref, PDFXRefStream) and 'XRefStm' in xrefs[i-1].get_trailer():
+                revisions[-1].append(xref)
+            else:
+                revisions.append([xref])
+        offsets = {}
+        for revision in revisions:
+            found = {}
+            free = set()
+            for xref in revision:
+                for objid in xref.get_objids():
+                    if objid in offsets or objid in found:
+                        continue
+                    try:
+                        found[objid] = xref.get_pos(objid)
+                    except KeyError:
+                        continue
+                free.update(xref.get_free_objids())
+            offsets.update(found)
+            for objid in free:
+                if objid not in offsets:
+                    offsets[objid] = (cls.FREE, 0, 0)
+        trailer = {}
+        for xref in reversed(xrefs):
+            trailer.update(xref.get_trailer())
+        self = cls()
+        for objid in sorted(offsets):
+            (strmid, index, genno) = offsets[objid]
+            self.objids.append(objid)
+            self.strmids.append(-1 if strmid is None else strmid)
+            self.fields.append(index)
+            self.gennos.append(genno)
+        # only what PDFDocument reads, the rest may hold direct streams
+        self.trailer = {k: v for (k, v) in trailer.items() if k in ('Root', 'Info', 'Encrypt', 'ID', 'Size')}
+        self.page_objids = page_objids
+        self.fallback = fallback
+        return self
+
+    def get_trailer(self):
+        return self.trailer
+
+    def get_objids(self):
+        return (objid for (objid, strmid) in zip(self.objids, self.strmids) if strmid != self.FREE)
+
+    def get_free_objids(self):
+        return (objid for (objid, strmid) in zip(self.objids, self.strmids) if strmid == self.FREE)
+
+    def _find(self, objid) -> int:
+        i = bisect_left(self.objids, objid)
+        if i == len(self.objids) or self.objids[i] != objid:
+            raise KeyError(objid)
+        return i
+
+    def is_free(self, objid) -> bool:
+        try:
+            return self.strmids[self._find(objid)] == self.FREE
+        except KeyError:
+            return False
+
+    def get_pos(self, objid):
+        i = self._find(objid)
+        strmid = self.strmids[i]
+        if strmid == self.FREE:
+            raise KeyError(objid)
+        return (None if strmid < 0 else strmid, self.fields[i], self.gennos[i])
+
+    def save(self, path: str, parser):
+        """Writes the index to path, see load_saved: a line of JSON (the
+        fingerprint of the file, its trailer and page objids) followed by
+        the columns as raw 64-bit integers."""
+        header = dict(
+            format=INDEX_FORMAT,
+            version=INDEX_VERSION,
+            mtime=file_mtime(parser),
+            byteorder=sys.byteorder,
+            count=len(self.objids),
+            trailer=dump_object(self.trailer, self.get_genno),
+            page_objids=self.page_objids,
+            fallback=self.fallback,
+            **file_fingerprint(parser)
+        )
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'wb') as fp:
+            fp.write(json.dumps(header, separators=(',', ':')).encode('ascii') + b'\n')
+            for column in (self.objids, self.strmids, self.fields, self.gennos):
+                column.tofile(fp)
+        os.replace(tmp_path, path)
+        return
+
+    @classmethod
+    def load_saved(cls, path: str, parser):
+        """Reads an index written by save, None when there is none or it was
+        saved for another file."""
+        try:
+            with open(path, 'rb') as fp:
+                header = json.loads(fp.readline())
+                body = fp.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log.warning('Ignoring unreadable index %s: %r', path, e)
+            return None
+        if (
+            not isinstance(header, dict) or
+            header.get('format') != INDEX_FORMAT or
+            header.get('version') != INDEX_VERSION or
+            header.get('mtime') != file_mtime(parser) or
+            header.get('byteorder') != sys.byteorder or
+            any(header.get(k) != v for (k, v) in file_fingerprint(parser).items())
+        ):
+            return None
+        self = cls()
+        columns = (self.objids, self.strmids, self.fields, self.gennos)
+        count = header.get('count')
+        if not isinstance(count, int) or len(body) != count * self.objids.itemsize * len(columns):
+            log.warning('Ignoring truncated index %s', path)
+            return None
+        size = count * self.objids.itemsize
+        for (i, column) in enumerate(columns):
+            column.frombytes(body[i*size:(i+1)*size])
+        try:
+            self.trailer = load_object(header['trailer'])
+        except (KeyError, TypeError, ValueError) as e:
+            log.warning('Ignoring unreadable index %s: %r', path, e)
+            return None
+        self.page_objids = header['page_objids']
+        self.fallback = header['fallback']
+        return self
+
+    def get_genno(self, objid) -> int:
+        try:
+            return self.gennos[self._find(objid)]
+        except KeyError:
+            return 0
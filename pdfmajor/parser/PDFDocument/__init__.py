@@ -1,4 +1,7 @@
 import hashlib as md5
+import sys
+import threading
+from array import array
 
 from Crypto.Cipher import ARC4, AES
 from Crypto.Hash import SHA256
@@ -15,21 +18,51 @@ from pdfmajor.execptions import (
     PDFSyntaxError
 )
 
-from ...utils import settings, choplist, decode_text
+from ...utils import settings, choplist, decode_text, CachePolicy
 from ..PSStackParser import KWD
 from ..PSStackParser import literal_name
-from ..PDFStream import int_value, str_value, dict_value, list_value, decipher_all
+from ..PDFStream import int_value, str_value, dict_value, list_value, decipher_all, PDFObjRef
 from ..PDFParser import PDFStreamParser, PDFStream
 
 from .PDFSecurityHandler import PDFStandardSecurityHandler
 from .PDFSecurityHandler import PDFStandardSecurityHandlerV4
 from .PDFSecurityHandler import PDFStandardSecurityHandlerV5
-from .PDFXRef import PDFXRefFallback, PDFXRef, PDFXRefStream
+from .PDFXRef import PDFXRefFallback, PDFXRef, PDFXRefStream, PDFXRefIndex
 
 from .constants import LITERAL_CATALOG, LITERAL_OBJSTM
 
 log = getLogger(__name__)
 
+def estimate_size(obj, depth=0) -> int:
+    """Rough memory footprint of a parsed object, references are not followed
+    and the decoded data of streams is accounted separately."""
+    size = sys.getsizeof(obj)
+    if 8 < depth:
+        return size
+    if isinstance(obj, dict):
+        for (k, v) in obj.items():
+            size += sys.getsizeof(k) + estimate_size(v, depth+1)
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            size += estimate_size(v, depth+1)
+    elif isinstance(obj, PDFStream):
+        size += estimate_size(obj.attrs, depth+1)
+        if isinstance(obj.rawdata, bytes):
+            size += len(obj.rawdata)
+    return size
+
+def attach_document(obj, doc):
+    """Sets the document of the references in obj, they lose it when pickled."""
+    if isinstance(obj, PDFObjRef):
+        obj.doc = doc
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            attach_document(v, doc)
+    elif isinstance(obj, list):
+        for v in obj:
+            attach_document(v, doc)
+    return
+
 ##  PDFDocument
 ##
 class PDFDocument(object):
@@ -44,6 +77,35 @@ class PDFDocument(object):
       doc = PDFDocument(parser, password)
       obj = doc.getobj(objid)
 
+    xrefs lists the xref sections newest first, as they were read. Objects
+    are looked up in one table merged from them (see PDFXRefIndex.build):
+    an object deleted by a newer section is not found in older ones.
+
+    Resolved objects and the member offsets of object streams (members
+    are parsed one at a time from there) are cached, without bounds by
+    default. A CachePolicy limits both caches by entry count and/or an
+    estimated size, and the decoded data of streams by its own byte budget
+    (evicted streams are decoded again when needed). Content streams are
+    kept compiled (see CompiledContent) within max_content_bytes, and up
+    to max_forms interpreted form xobjects are kept to be replayed. The
+    resolved fonts, color spaces and xobjects of up to max_resources
+    indirect /Resources are shared by the pages and forms using them.
+    caching=False without a policy disables the caches.
+
+    fallback=True recovers the object table by scanning the whole file
+    (see PDFXRefFallback) before anything is read, fallback='lazy' only
+    when the xrefs are unusable or an object is missing from them, and
+    fallback=False never. With recovery_path the recovered table is saved
+    there and reused as long as the file is unchanged.
+
+    With index_path the merged xrefs, trailer and page objids are read
+    from that sidecar file (see PDFXRefIndex) instead of the file itself
+    when it matches the file, save_index writes it.
+
+    getobj may be called from several threads: the thread that opened
+    the document uses its parser and every other thread a fork of it (see
+    PSBaseParser.fork) over the same file, and the caches are locked. The
+    xrefs read later (lazily or by the fallback) are read under a lock.
     """
 
     security_handler_registry = {
@@ -55,32 +117,90 @@ class PDFDocument(object):
         if SHA256 is not None:
             security_handler_registry[5] = PDFStandardSecurityHandlerV5
 
-    def __init__(self, parser, password='', caching=True, fallback=True):
+    def __init__(self, parser, password='', caching=True, fallback=True, cache_policy: CachePolicy = None,
+                 recovery_path: str = None, index_path: str = None):
         "Set the document to use a given PDFParser object."
-        self.caching = caching
+        self.caching = caching or cache_policy is not None
+        self.cache_policy = cache_policy
         self.xrefs = []
         self.info = []
         self.catalog = None
         self.encryption = None
         self.decipher = None
         self._parser = None
-        self._cached_objs = {}
-        self._parsed_objs = {}
+        if cache_policy is None:
+            cache_policy = CachePolicy()
+        self._cached_objs = cache_policy.make_cache(sizeof=estimate_size)
+        # objid of object streams -> (first, offsets) of their members
+        self._objstm_headers = cache_policy.make_cache(sizeof=lambda x: sys.getsizeof(x[1]))
+        # only a data budget keeps the raw data of streams around to decode
+        # them again, without one the decoded data just stays on its stream
+        self._data_cache = None
+        if self.cache_policy is not None and self.cache_policy.max_data_bytes > 0:
+            self._data_cache = cache_policy.make_data_cache(on_evict=lambda _, strm: strm.release_data())
+        # (objid, genno)s of content streams -> CompiledContent (see CompiledContent.load)
+        self.content_cache = cache_policy.make_content_cache() if self.caching else None
+        # (objid, genno, graphic state, profile) of forms -> (ctm, layout items)
+        self.form_cache = cache_policy.make_form_cache() if self.caching else None
+        # objid of /Resources -> their resolved (fontmap, colorspace_map, xobjmap)
+        self.resource_cache = cache_policy.make_resource_cache() if self.caching else None
+        # page number -> (objid, attrs) of the page-tree leaves located so far
+        self.page_index = {}
         self._parser = parser
         self._parser.set_document(self)
+        # the parsers of the other threads, see _get_parser
+        self._owner = threading.get_ident()
+        self._local = threading.local()
+        self._lock = threading.RLock()
         self.is_printable = self.is_modifiable = self.is_extractable = True
         # Retrieve the information of each header that was appended
         # (maybe multiple times) at the end of the document.
-        try:
-            pos = self.find_xref(parser)
-            self.read_xref_from(parser, pos, self.xrefs)
-        except PDFNoValidXRef:
-            pass # fallback = True
-        if fallback:
-            parser.fallback = True
-            xref = PDFXRefFallback()
-            xref.load(parser)
-            self.xrefs.append(xref)
+        self.fallback = fallback
+        self.recovery_path = recovery_path
+        self._fallback = None
+        # position of the xref sections not read yet, see find_linearized
+        self._pending_prev = None
+        self.index_path = index_path
+        # page number -> objid, from the sidecar index
+        self.page_objids = None
+        # the xrefs getobj searches, the sections merged into one table
+        # (the newest one listing an objid wins) then the fallback
+        self._lookup_xrefs = []
+        index = PDFXRefIndex.load_saved(index_path, parser) if index_path is not None else None
+        if index is not None:
+            attach_document(index.trailer, self)
+            self.xrefs.append(index)
+            self._lookup_xrefs.append(index)
+            self.page_objids = index.page_objids
+            if index.fallback:
+                # the recovered objects are part of the index
+                parser.fallback = True
+                self._fallback = index
+        else:
+            # a linearized file starts with the xref of its first page, the
+            # others are only read once an object is missing from it
+            pos = self.find_linearized(parser)
+            if pos is not None:
+                try:
+                    self.read_xref_from(parser, pos, self.xrefs, follow_prev=False)
+                except (PDFNoValidXRef, PDFSyntaxError, PSEOF):
+                    self.xrefs = []
+                    self._pending_prev = None
+                if not any('Root' in xref.get_trailer() for xref in self.xrefs):
+                    self.xrefs = []
+                    self._pending_prev = None
+            if not self.xrefs:
+                try:
+                    pos = self.find_xref(parser)
+                    self.read_xref_from(parser, pos, self.xrefs)
+                except PDFNoValidXRef:
+                    pass # fallback = True
+            self._index_sections()
+            if fallback == 'lazy':
+                if not any('Root' in xref.get_trailer() for xref in self.xrefs):
+                    self.load_fallback()
+            elif fallback:
+                self.load_fallback()
         for xref in self.xrefs:
             trailer = xref.get_trailer()
             if not trailer:
@@ -124,21 +244,91 @@ class PDFDocument(object):
         self._parser.fallback = False # need to read streams with exact length
         return
 
+    def _get_parser(self):
+        """Returns the parser of the calling thread."""
+        if threading.get_ident() == self._owner:
+            return self._parser
+        parser = getattr(self._local, 'parser', None)
+        if parser is None:
+            parser = self._local.parser = self._parser.fork()
+        parser.fallback = self._parser.fallback
+        return parser
+
+    def load_fallback(self):
+        """Recovers the object table from the whole file, or from the table
+        saved at recovery_path, and appends it to the xrefs."""
+        with self._lock:
+            if self._fallback is not None:
+                return self._fallback
+            if self.decipher is None:
+                self._parser.fallback = True
+            parser = self._get_parser()
+            xref = PDFXRefFallback()
+            if self.recovery_path is None or not xref.load_saved(self.recovery_path, parser):
+                xref.load(parser)
+                if self.recovery_path is not None:
+                    try:
+                        xref.save(self.recovery_path, parser)
+                    except OSError as e:
+                        log.warning('recovery table not saved: %r', e)
+            self._fallback = xref
+            self.xrefs.append(xref)
+            self._index_sections()
+            return xref
+
+    def _index_sections(self):
+        sections = [xref for xref in self.xrefs if xref is not self._fallback]
+        # built aside, other threads may be looking objects up
+        lookup_xrefs = []
+        if len(sections) == 1:
+            lookup_xrefs.append(sections[0])
+        elif sections:
+            lookup_xrefs.append(PDFXRefIndex.build(sections))
+        if self._fallback is not None:
+            lookup_xrefs.append(self._fallback)
+        self._lookup_xrefs = lookup_xrefs
+        return
+
+    def _read_pending_xrefs(self):
+        with self._lock:
+            pos = self._pending_prev
+            if pos is None:
+                # read by another thread meanwhile
+                return
+            self._pending_prev = None
+            log.info('reading the xrefs after the first page: pos=%r', pos)
+            try:
+                self.read_xref_from(self._get_parser(), pos, self.xrefs)
+            except (PDFNoValidXRef, PDFSyntaxError, PSEOF) as e:
+                log.warning('Invalid xref at %r: %r', pos, e)
+            # the fallback stays last
+            if self._fallback is not None:
+                self.xrefs.remove(self._fallback)
+                self.xrefs.append(self._fallback)
+            self._index_sections()
+        return
+
     def _getobj_objstm(self, stream, index, objid):
-        if stream.objid in self._parsed_objs:
-            (objs, n) = self._parsed_objs[stream.objid]
-        else:
-            (objs, n) = self._get_objects(stream)
+        header = self._objstm_headers.get(stream.objid) if self.caching else None
+        if header is None:
+            header = self._get_objstm_header(stream)
             if self.caching:
-                self._parsed_objs[stream.objid] = (objs, n)
-        i = n*2+index
-        try:
-            obj = objs[i]
-        except IndexError:
+                self._objstm_headers.put(stream.objid, header)
+        (first, offsets) = header
+        if not (0 <= index < len(offsets)):
             raise PDFSyntaxError('index too big: %r' % index)
+        parser = PDFStreamParser(stream.get_data())
+        parser.set_document(self)
+        parser.seek(first+offsets[index])
+        try:
+            (_, obj) = parser.nextobject()
+        except PSEOF:
+            raise PDFSyntaxError('object %r not found in stream %r' % (objid, stream.objid))
         return obj
 
-    def _get_objects(self, stream):
+    def _get_objstm_header(self, stream):
+        """Returns (first, offsets): the member at index i of the object
+        stream starts at first+offsets[i] in its data."""
         if stream.get('Type') is not LITERAL_OBJSTM:
             if settings.STRICT:
                 raise PDFSyntaxError('Not a stream object: %r' % stream)
@@ -148,22 +338,40 @@ class PDFDocument(object):
             if settings.STRICT:
                 raise PDFSyntaxError('N is not defined: %r' % stream)
             n = 0
+        first = stream.get('First')
+        parser = PDFStreamParser(stream.get_data())
+        header = []
+        try:
+            while len(header) < 2*n:
+                (_, token) = parser.nexttoken()
+                header.append(token)
+        except PSEOF:
+            pass
+        if isinstance(first, int) and all(isinstance(x, int) for x in header):
+            return (first, array('q', header[1::2]))
+        # no usable offsets, take the positions of the objects after the
+        # 2*n header numbers
+        log.warning('Invalid object stream header: %r', stream)
+        return (0, array('q', [pos for (pos, _) in self._get_objects(stream)[n*2:]]))
+
+    def _get_objects(self, stream):
+        """Parses the whole object stream, returns the (pos, obj)s."""
         parser = PDFStreamParser(stream.get_data())
         parser.set_document(self)
         objs = []
         try:
             while 1:
-                (_, obj) = parser.nextobject()
-                objs.append(obj)
+                objs.append(parser.nextobject())
         except PSEOF:
             pass
-        return (objs, n)
+        return objs
 
     def _getobj_parse(self, pos, objid):
-        self._parser.seek(pos)
-        (_, objid1) = self._parser.nexttoken()  # objid
-        (_, genno) = self._parser.nexttoken()  # genno
-        (_, kwd) = self._parser.nexttoken()
+        parser = self._get_parser()
+        parser.seek(pos)
+        (_, objid1) = parser.nexttoken()  # objid
+        (_, genno) = parser.nexttoken()  # genno
+        (_, kwd) = parser.nexttoken()
         # #### hack around malformed pdf files
         # copied from https://github.com/jaepil/pdfminer3k/blob/master/pdfminer/pdfparser.py#L399
         #to solve https://github.com/pdfminer/pdfminer.six/issues/56
@@ -171,7 +379,7 @@ class PDFDocument(object):
         if objid1 != objid:
             x = []
             while kwd is not self.KEYWORD_OBJ:
-                (_,kwd) = self._parser.nexttoken()
+                (_,kwd) = parser.nexttoken()
                 x.append(kwd)
             if x:
                 objid1 = x[-2]
@@ -182,7 +390,7 @@ class PDFDocument(object):
 
         if kwd != KWD(b'obj'):
             raise PDFSyntaxError('Invalid object spec: offset=%r' % pos)
-        (_, obj) = self._parser.nextobject()
+        (_, obj) = parser.nextobject()
         return obj
 
     # can raise PDFObjectNotFound
@@ -191,35 +399,108 @@ class PDFDocument(object):
         if not self.xrefs:
             raise ParserError('PDFDocument is not initialized')
         log.debug('getobj: objid=%r', objid)
-        if objid in self._cached_objs:
-            (obj, genno) = self._cached_objs[objid]
+        cached = self._cached_objs.get(objid) if self.caching else None
+        if cached is not None:
+            (obj, genno) = cached
         else:
-            for xref in self.xrefs:
+            while True:
+                xrefs = self._lookup_xrefs
                 try:
-                    (strmid, index, genno) = xref.get_pos(objid)
-                except KeyError:
-                    continue
-                try:
-                    if strmid is not None:
-                        stream = PDFStream.validated_stream(self.getobj(strmid))
-                        obj = self._getobj_objstm(stream, index, objid)
-                    else:
-                        obj = self._getobj_parse(index, objid)
-                        if self.decipher:
-                            obj = decipher_all(self.decipher, objid, genno, obj)
-
-                    if isinstance(obj, PDFStream):
-                        obj.set_objid(objid, genno)
+                    (obj, genno) = self._lookup(objid, xrefs)
+                    break
+                except PDFObjectNotFound:
+                    # waits for the xrefs another thread may be reading
+                    with self._lock:
+                        if self._lookup_xrefs is not xrefs:
+                            continue
+                        if self._pending_prev is not None:
+                            self._read_pending_xrefs()
+                            continue
+                        if self.fallback != 'lazy' or self._fallback in xrefs or self.is_free(objid):
+                            raise
+                        fallback = self.load_fallback()
+                    (obj, genno) = self._lookup(objid, [fallback])
                     break
-                except (PSEOF, PDFSyntaxError):
-                    continue
-            else:
-                raise PDFObjectNotFound(objid)
             log.debug('register: objid=%r: %r', objid, obj)
             if self.caching:
-                self._cached_objs[objid] = (obj, genno)
+                self._cached_objs.put(objid, (obj, genno))
         return obj
 
+    def uncache(self, objids):
+        """Drops objects (and the decoded data of streams) from the caches,
+        e.g. those of a page that is not read again."""
+        for objid in objids:
+            cached = self._cached_objs.pop(objid)
+            if cached is not None and self._data_cache is not None and isinstance(cached[0], PDFStream):
+                self._data_cache.pop((objid, cached[1]))
+        return
+
+    def close(self):
+        """Closes the parser (and its memory map), the file is left to
+        the caller that opened it."""
+        self._parser.close()
+        return
+
+    def save_index(self, page_objids=None):
+        """Writes the sidecar index to index_path, page_objids lists the
+        objid of every page (PDFPage.open_document passes them)."""
+        if self._pending_prev is not None:
+            self._read_pending_xrefs()
+        index = PDFXRefIndex.build(self.xrefs, page_objids, self._fallback is not None)
+        try:
+            index.save(self.index_path, self._get_parser())
+        except (OSError, TypeError) as e:
+            log.warning('index not saved: %r', e)
+        return
+
+    def is_free(self, objid) -> bool:
+        """True when the newest xref section marks objid as deleted."""
+        return bool(self._lookup_xrefs) and self._lookup_xrefs[0].is_free(objid)
+
+    def _lookup(self, objid, xrefs):
+        for xref in xrefs:
+            try:
+                (strmid, index, genno) = xref.get_pos(objid)
+            except KeyError:
+                if xref.is_free(objid):
+                    # deleted, older copies must not come back
+                    break
+                continue
+            try:
+                if strmid is not None:
+                    stream = PDFStream.validated_stream(self.getobj(strmid))
+                    obj = self._getobj_objstm(stream, index, objid)
+                else:
+                    obj = self._getobj_parse(index, objid)
+                    if self.decipher:
+                        obj = decipher_all(self.decipher, objid, genno, obj)
+
+                if isinstance(obj, PDFStream):
+                    obj.set_objid(objid, genno)
+                    obj.data_cache = self._data_cache
+                return (obj, genno)
+            except (PSEOF, PDFSyntaxError):
+                continue
+        raise PDFObjectNotFound(objid)
+
+    def cache_stats(self) -> dict:
+        """Hit, miss and eviction counters (plus current entries and estimated
+        bytes) of the object, object stream, decoded stream data, compiled
+        content, interpreted form and resource map caches."""
+        stats = {
+            'objects': self._cached_objs.stats(),
+            'object_streams': self._objstm_headers.stats(),
+        }
+        if self._data_cache is not None:
+            stats['stream_data'] = self._data_cache.stats()
+        if self.content_cache is not None:
+            stats['content'] = self.content_cache.stats()
+        if self.form_cache is not None:
+            stats['forms'] = self.form_cache.stats()
+        if self.resource_cache is not None:
+            stats['resources'] = self.resource_cache.stats()
+        return stats
+
     def get_outlines(self):
         if 'Outlines' not in self.catalog:
             raise PDFNoOutlines
@@ -299,8 +580,41 @@ class PDFDocument(object):
         return int(prev)
 
     # read xref table
-    def read_xref_from(self, parser, start, xrefs):
-        """Reads XRefs from the given location."""
+    def find_linearized(self, parser):
+        """Returns the position of the first-page xref of a linearized
+        file, None when the file is not linearized or was updated since
+        (its /L is not the file length)."""
+        try:
+            parser.fp.seek(0, 2)
+            length = parser.fp.tell()
+            parser.seek(0)
+            parser.reset()
+            (_, objid) = parser.nexttoken()
+            (_, genno) = parser.nexttoken()
+            (_, kwd) = parser.nexttoken()
+            if not isinstance(objid, int) or not isinstance(genno, int) or kwd is not self.KEYWORD_OBJ:
+                return None
+            (_, dic) = parser.nextobject()
+            if not isinstance(dic, dict) or 'Linearized' not in dic:
+                return None
+            if dic.get('L') != length:
+                log.info('Linearized file was updated, reading it from the end.')
+                return None
+            # the first-page xref (a table or a stream) follows the dict
+            (pos, token) = parser.nexttoken()
+            if token is parser.KEYWORD_ENDOBJ:
+                (pos, token) = parser.nexttoken()
+            if token is not parser.KEYWORD_XREF and not isinstance(token, int):
+                return None
+        except ParserError:
+            # also a first object that is a stream with an indirect /Length
+            return None
+        log.info('linearized, first-page xref found: pos=%r', pos)
+        return pos
+
+    def read_xref_from(self, parser, start, xrefs, follow_prev=True):
+        """Reads XRefs from the given location, with follow_prev=False the
+        position of the previous ones is kept to be read when needed."""
         parser.seek(start)
         parser.reset()
         try:
@@ -328,5 +642,8 @@ class PDFDocument(object):
         if 'Prev' in trailer:
             # find previous xref
             pos = int_value(trailer['Prev'])
+            if not follow_prev:
+                self._pending_prev = pos
+                return
             self.read_xref_from(parser, pos, xrefs)
         return
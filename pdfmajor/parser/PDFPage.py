@@ -1,10 +1,11 @@
 
 import logging
+from typing import Optional, Tuple
 
 from pdfmajor.execptions import PDFTextExtractionNotAllowed, PDFObjectNotFound
 from ..utils import settings
 from .constants import LIT
-from .PDFStream import resolve1, int_value, list_value, dict_value
+from .PDFStream import PDFStream, resolve1, int_value, list_value, dict_value
 from .PDFParser import PDFParser
 from .PDFDocument import PDFDocument
 
@@ -49,6 +50,8 @@ class PDFPage(object):
         """
         self.doc = doc
         self.pageid = pageid
+        # the page number, when the page was looked up by it
+        self.pageno = None
         self.attrs = dict_value(attrs)
         self.lastmod = resolve1(self.attrs.get('LastModified'))
         self.resources = resolve1(self.attrs.get('Resources', dict()))
@@ -72,30 +75,61 @@ class PDFPage(object):
     def __repr__(self):
         return '<PDFPage: Resources=%r, MediaBox=%r>' % (self.resources, self.mediabox)
 
+    def release(self):
+        """Drops what the document caches for this page alone: its dict,
+        its content streams with their decoded data and compiled content,
+        and its page-index entry. Resources shared with other pages stay."""
+        doc = self.doc
+        streams = [resolve1(strm) for strm in self.contents]
+        objids = [strm.objid for strm in streams if isinstance(strm, PDFStream) and strm.objid is not None]
+        if doc.content_cache is not None and streams and len(objids) == len(streams):
+            doc.content_cache.pop(tuple((strm.objid, strm.genno) for strm in streams))
+        # an indirect array of content streams
+        objids.append(getattr(self.attrs.get('Contents'), 'objid', None))
+        objids.append(self.pageid)
+        doc.uncache(objid for objid in objids if isinstance(objid, int))
+        if self.pageno is not None:
+            doc.page_index.pop(self.pageno, None)
+        return
+
     INHERITABLE_ATTRS = set(['Resources', 'MediaBox', 'CropBox', 'Rotate'])
 
     @classmethod
-    def create_pages(cls, document: PDFDocument):
+    def _tree_type(cls, tree: dict):
+        tree_type = tree.get('Type')
+        if tree_type is None and not settings.STRICT:  # See #64
+            tree_type = tree.get('type')
+        return tree_type
+
+    @classmethod
+    def _inherit(cls, tree: dict, parent: dict) -> dict:
+        tree = tree.copy()
+        for (k, v) in parent.items():
+            if k in cls.INHERITABLE_ATTRS and k not in tree:
+                tree[k] = v
+        return tree
+
+    @classmethod
+    def iter_leaves(cls, document: PDFDocument, release: bool = False):
+        """Walks the page tree, yields (objid, attrs) for every page. With
+        release the nodes are dropped from the document's caches once walked."""
         def search(obj, parent):
             if isinstance(obj, int):
                 objid = obj
-                tree = dict_value(document.getobj(objid)).copy()
+                tree = dict_value(document.getobj(objid))
             else:
                 objid = obj.objid
-                tree = dict_value(obj).copy()
-            for (k, v) in parent.items():
-                if k in cls.INHERITABLE_ATTRS and k not in tree:
-                    tree[k] = v
-
-            tree_type = tree.get('Type')
-            if tree_type is None and not settings.STRICT:  # See #64
-                tree_type = tree.get('type')
+                tree = dict_value(obj)
+            tree = cls._inherit(tree, parent)
+            tree_type = cls._tree_type(tree)
 
             if tree_type is LITERAL_PAGES and 'Kids' in tree:
                 log.debug('Pages: Kids=%r', tree['Kids'])
                 for c in list_value(tree['Kids']):
                     for x in search(c, tree):
                         yield x
+                if release:
+                    document.uncache([objid])
             elif tree_type is LITERAL_PAGE:
                 log.debug('Page: %r', tree)
                 yield (objid, tree)
@@ -103,7 +137,7 @@ class PDFPage(object):
         pages = False
         if 'Pages' in document.catalog:
             for (objid, tree) in search(document.catalog['Pages'], document.catalog):
-                yield cls(document, objid, tree)
+                yield (objid, tree)
                 pages = True
         if not pages:
             # fallback when /Pages is missing.
@@ -112,27 +146,185 @@ class PDFPage(object):
                     try:
                         obj = document.getobj(objid)
                         if isinstance(obj, dict) and obj.get('Type') is LITERAL_PAGE:
-                            yield cls(document, objid, obj)
+                            yield (objid, obj)
                     except PDFObjectNotFound:
                         pass
         return
 
     @classmethod
-    def get_pages(cls, fp,
-                  pagenos=None, maxpages=0, password='',
-                  caching=True, check_extractable=True):
+    def create_pages(cls, document: PDFDocument, release: bool = False):
+        if document.page_objids is not None:
+            for pageno in range(len(document.page_objids)):
+                yield cls.get_page(document, pageno)
+            return
+        for (objid, tree) in cls.iter_leaves(document, release=release):
+            yield cls(document, objid, tree)
+        return
+
+    @classmethod
+    def _indexed_page(cls, document: PDFDocument, pageno: int) -> Optional[Tuple[int, dict]]:
+        """Builds the attrs of a page listed in the sidecar index, the
+        inherited ones are taken from its /Parent chain."""
+        if not (0 <= pageno < len(document.page_objids)):
+            return None
+        objid = document.page_objids[pageno]
+        tree = node = dict_value(document.getobj(objid))
+        visited = set([objid])
+        while 'Parent' in node:
+            parent = node['Parent']
+            if getattr(parent, 'objid', None) in visited:
+                log.warning('Page tree has a cycle at objid=%r', parent.objid)
+                break
+            visited.add(getattr(parent, 'objid', None))
+            node = dict_value(parent)
+            tree = cls._inherit(tree, node)
+        return (objid, cls._inherit(tree, document.catalog))
+
+    @classmethod
+    def count_pages(cls, document: PDFDocument) -> Optional[int]:
+        """Returns the /Count of the page-tree root, None when the document has none."""
+        if document.page_objids is not None:
+            return len(document.page_objids)
+        if 'Pages' not in document.catalog:
+            return None
+        count = resolve1(dict_value(document.catalog['Pages']).get('Count'))
+        if not isinstance(count, int) or count < 0:
+            return None
+        return count
+
+    @classmethod
+    def lookup_page(cls, document: PDFDocument, pageno: int) -> Optional[Tuple[int, dict]]:
+        """Finds the page-tree leaf of the given page number.
+
+        The tree is descended using the /Count of the intermediate /Pages
+        nodes, so only the nodes on the path (and their direct kids) are
+        resolved. Returns (objid, attrs) with the inherited attributes
+        merged in, or None when the tree does not carry usable counts.
+        """
+        if pageno in document.page_index:
+            return document.page_index[pageno]
+        if document.page_objids is not None:
+            found = cls._indexed_page(document, pageno)
+            if found is not None:
+                document.page_index[pageno] = found
+            return found
+        if 'Pages' not in document.catalog:
+            return None
+        obj = document.catalog['Pages']
+        tree = cls._inherit(dict_value(obj), document.catalog)
+        remaining = pageno
+        visited = set()
+        while 1:
+            objid = getattr(obj, 'objid', None)
+            if objid is not None:
+                if objid in visited:
+                    log.warning('Page tree has a cycle at objid=%r', objid)
+                    return None
+                visited.add(objid)
+            tree_type = cls._tree_type(tree)
+            if tree_type is LITERAL_PAGE:
+                if remaining:
+                    return None
+                document.page_index[pageno] = (objid, tree)
+                return (objid, tree)
+            if tree_type is not LITERAL_PAGES or 'Kids' not in tree:
+                return None
+            for kid in list_value(tree['Kids']):
+                kid_tree = dict_value(kid)
+                kid_type = cls._tree_type(kid_tree)
+                if kid_type is LITERAL_PAGE:
+                    count = 1
+                elif kid_type is LITERAL_PAGES and 'Kids' in kid_tree:
+                    count = resolve1(kid_tree.get('Count'))
+                    if not isinstance(count, int):
+                        return None
+                else:
+                    continue
+                if remaining < count:
+                    break
+                remaining -= count
+            else:
+                # the counts do not add up
+                return None
+            (obj, tree) = (kid, cls._inherit(kid_tree, tree))
+
+    @classmethod
+    def get_page(cls, document: PDFDocument, pageno: int):
+        """Builds a single page through the page index, None if it cannot be located."""
+        found = cls.lookup_page(document, pageno)
+        if found is None:
+            return None
+        (objid, tree) = found
+        page = cls(document, objid, tree)
+        page.pageno = pageno
+        return page
+
+    @classmethod
+    def select_pages(cls, document: PDFDocument, pagenos=None, maxpages=0, release: bool = False):
+        """Yields (pageno, page) for every page that passes the pagenos/maxpages filters.
+
+        When pagenos is given and the page tree has /Count entries only the
+        requested pages are built, otherwise the whole tree is walked. With
+        release the tree nodes and the pages filtered out are released as
+        the walk goes, the caller releases the pages it is given.
+        """
+        last = -1
+        count = cls.count_pages(document) if pagenos else None
+        if count is not None:
+            for pageno in sorted(set(pagenos)):
+                if pageno < 0:
+                    continue
+                if count <= pageno:
+                    # past /Count, which broken files often get wrong
+                    log.info('Page %d is past /Count %d, walking the page tree instead.', pageno, count)
+                    break
+                page = cls.get_page(document, pageno)
+                if page is None:
+                    log.info('Page tree cannot be indexed, walking it instead.')
+                    break
+                yield (pageno, page)
+                last = pageno
+                if maxpages and maxpages <= pageno+1:
+                    return
+            else:
+                return
+        for (pageno, page) in enumerate(cls.create_pages(document, release=release)):
+            if pageno <= last or (pagenos and (pageno not in pagenos)):
+                if release:
+                    page.release()
+                continue
+            yield (pageno, page)
+            if maxpages and maxpages <= pageno+1:
+                break
+        return
+
+    @classmethod
+    def open_document(cls, fp, password='', caching=True, check_extractable=True, use_mmap=False,
+                      cache_policy=None, fallback=True, recovery_path=None, index_path=None) -> PDFDocument:
         # Create a PDF parser object associated with the file object.
-        parser = PDFParser(fp)
+        parser = PDFParser(fp, use_mmap=use_mmap)
         # Create a PDF document object that stores the document structure.
-        doc = PDFDocument(parser, password=password, caching=caching)
+        doc = PDFDocument(parser, password=password, caching=caching, cache_policy=cache_policy,
+                          fallback=fallback, recovery_path=recovery_path, index_path=index_path)
+        if index_path is not None and doc.page_objids is None:
+            doc.save_index([objid for (objid, _) in cls.iter_leaves(doc)])
         # Check if the document allows text extraction. If not, abort.
         if check_extractable and not doc.is_extractable:
             raise PDFTextExtractionNotAllowed('Text extraction is not allowed: %r' % fp)
+        return doc
+
+    @classmethod
+    def get_pages(cls, fp,
+                  pagenos=None, maxpages=0, password='',
+                  caching=True, check_extractable=True, use_mmap=False, cache_policy=None,
+                  fallback=True, recovery_path=None, index_path=None):
+        doc = cls.open_document(fp, password=password, caching=caching, check_extractable=check_extractable,
+                                use_mmap=use_mmap, cache_policy=cache_policy,
+                                fallback=fallback, recovery_path=recovery_path, index_path=index_path)
         # Process each page contained in the document.
-        for (pageno, page) in enumerate(cls.create_pages(doc)):
-            if pagenos and (pageno not in pagenos):
-                continue
-            yield page
-            if maxpages and maxpages <= pageno+1:
-                break
+        try:
+            for (_, page) in cls.select_pages(doc, pagenos=pagenos, maxpages=maxpages):
+                yield page
+        finally:
+            doc.close()
         return
@@ -36,10 +36,12 @@ class PDFParser(PSStackParser):
       parser.seek(offset)
       parser.nextobject()
 
+    With use_mmap=True the file is scanned through a memory map and the
+    raw data of every stream is a memoryview slice of that map.
     """
 
-    def __init__(self, fp: TextIOWrapper):
-        PSStackParser.__init__(self, fp)
+    def __init__(self, fp: TextIOWrapper, use_mmap: bool = False):
+        PSStackParser.__init__(self, fp, use_mmap=use_mmap)
         self.doc = None
         self.fallback = False
         return
@@ -98,6 +100,13 @@ class PDFParser(PSStackParser):
                     raise PDFSyntaxError('Unexpected EOF')
                 return
             pos += len(line)
+            if self._map is not None:
+                (data, objlen) = self.read_mapped_stream(pos, objlen)
+                self.seek(pos+objlen)
+                log.debug('Stream: pos=%d, objlen=%d, dic=%r (mapped)', pos, objlen, dic)
+                obj = PDFStream(dic, data, self.doc.decipher)
+                self.push((pos, obj))
+                return
             self.fp.seek(pos)
             data = bytearray(self.fp.read(objlen))
             self.seek(pos+objlen)
@@ -130,6 +139,22 @@ class PDFParser(PSStackParser):
 
         return
 
+    def read_mapped_stream(self, pos, objlen):
+        """Slices a stream body out of the memory map without copying it.
+
+        Returns (data, objlen) where objlen now spans up to `endstream`.
+        """
+        end = self._map.find(b'endstream', pos+objlen)
+        if end == -1:
+            if settings.STRICT:
+                raise PDFSyntaxError('Unexpected EOF')
+            end = len(self._map)
+        if self.fallback:
+            # the declared /Length is not trusted, take everything up to endstream.
+            objlen = end-pos
+        data = memoryview(self._map)[pos:pos+objlen]
+        return (data, end-pos)
+
 
 ##  PDFStreamParser
 ##
@@ -23,7 +23,17 @@ class PDFObjRef(PDFObject):
     def __repr__(self):
         return '<PDFObjRef:%d>' % (self.objid)
 
+    def __getstate__(self):
+        # the document (and its open file) stays behind when a reference
+        # is sent to another process, the copy can no longer be resolved
+        # (see resolve_refs for what to send instead).
+        state = self.__dict__.copy()
+        state['doc'] = None
+        return state
+
     def resolve(self, default=None):
+        if self.doc is None:
+            raise PDFValueError('%r is detached from its document' % self)
         try:
             return self.doc.getobj(self.objid)
         except PDFObjectNotFound:
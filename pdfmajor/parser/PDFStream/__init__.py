@@ -1,14 +1,16 @@
-import zlib
+from io import BytesIO
 
-from ...utils import lzwdecode
-from ...utils import ascii85decode, asciihexdecode, apply_png_predictor
+from ...utils import ascii85decode, asciihexdecode, iter_png_predictor
 
 from .constants import * 
 from .types import * 
 from .util import *
 from .ccitt import ccittfaxdecode
+from .decoders import ChunkReader, inflate_chunks, lzw_chunks, whole_chunks
 
 class PDFStream(PDFObject):
+    # raw size from which open_data stops decoding the whole stream at once
+    streaming_min_size = 1 << 20
 
     @classmethod
     def validated_stream(cls, x):
@@ -27,6 +29,9 @@ class PDFStream(PDFObject):
         self.data = None
         self.objid = None
         self.genno = None
+        # set by the document when the decoded data is budgeted, the raw
+        # data is then kept so that evicted data can be decoded again.
+        self.data_cache = None
         return
 
     def set_objid(self, objid, genno):
@@ -34,6 +39,15 @@ class PDFStream(PDFObject):
         self.genno = genno
         return
 
+    def __getstate__(self):
+        # memoryviews of a mapped file cannot be pickled, send a copy instead.
+        state = self.__dict__.copy()
+        state['data_cache'] = None
+        for key in ('rawdata', 'data'):
+            if isinstance(state[key], memoryview):
+                state[key] = state[key].tobytes()
+        return state
+
     def __repr__(self):
         if self.data is None:
             assert self.rawdata is not None
@@ -78,35 +92,42 @@ class PDFStream(PDFObject):
         return list(zip(_filters, params)) #solves https://github.com/pdfminer/pdfminer.six/issues/15
 
     def decode(self):
-        assert self.data is None and self.rawdata is not None, str((self.data, self.rawdata))
-        data = self.rawdata
+        """Decodes the raw data and keeps the result, which is returned."""
+        rawdata = self.rawdata
+        if rawdata is None:
+            # another thread decoded it meanwhile
+            assert self.data is not None
+            return self.data
+        if not self.get_filters() and not self.decipher:
+            data = rawdata
+        else:
+            data = b''.join(self.iter_decode(rawdata))
+        self.set_data(data)
+        return data
+
+    def iter_decode(self, rawdata=None):
+        """Decodes the raw data through the chain of filters and yields the
+        decoded data in chunks, nothing is kept on the stream."""
+        data = self.rawdata if rawdata is None else rawdata
         if self.decipher:
             # Handle encryption
+            if isinstance(data, memoryview):
+                data = data.tobytes()
             data = self.decipher(self.objid, self.genno, data, self.attrs)
-        filters = self.get_filters()
-        if not filters:
-            self.data = data
-            self.rawdata = None
-            return
-        for (f,params) in filters:
+        chunks = [data]
+        for (f,params) in self.get_filters():
             if f in LITERALS_FLATE_DECODE:
-                # will get errors if the document is encrypted.
-                try:
-                    data = zlib.decompress(data)
-                except zlib.error as e:
-                    if settings.STRICT:
-                        raise PDFException('Invalid zlib bytes: %r, %r' % (e, data))
-                    data = b''
+                chunks = inflate_chunks(chunks)
             elif f in LITERALS_LZW_DECODE:
-                data = lzwdecode(data)
+                chunks = lzw_chunks(chunks)
             elif f in LITERALS_ASCII85_DECODE:
-                data = ascii85decode(data)
+                chunks = whole_chunks(ascii85decode, chunks)
             elif f in LITERALS_ASCIIHEX_DECODE:
-                data = asciihexdecode(data)
+                chunks = whole_chunks(asciihexdecode, chunks)
             elif f in LITERALS_RUNLENGTH_DECODE:
-                data = rldecode(data)
+                chunks = whole_chunks(rldecode, chunks)
             elif f in LITERALS_CCITTFAX_DECODE:
-                data = ccittfaxdecode(data, params)
+                chunks = whole_chunks(ccittfaxdecode, chunks, params)
             elif f in LITERALS_DCT_DECODE:
                 # This is probably a JPG stream - it does not need to be decoded twice.
                 # Just return the stream to the user.
@@ -127,17 +148,58 @@ class PDFStream(PDFObject):
                     colors = int_value(params.get('Colors', 1))
                     columns = int_value(params.get('Columns', 1))
                     bitspercomponent = int_value(params.get('BitsPerComponent', 8))
-                    data = apply_png_predictor(pred, colors, columns, bitspercomponent, data)
+                    chunks = iter_png_predictor(pred, colors, columns, bitspercomponent, chunks)
                 else:
                     raise PDFNotImplementedError('Unsupported predictor: %r' % pred)
+        for chunk in chunks:
+            if chunk:
+                yield chunk
+
+    def set_data(self, data):
         self.data = data
-        self.rawdata = None
+        if self.data_cache is None:
+            self.rawdata = None
+        else:
+            self.data_cache.put((self.objid, self.genno), self, size=len(data))
+        return
+
+    def release_data(self):
+        """Drops the decoded data, it is decoded again from the raw data when needed."""
+        if self.rawdata is not None:
+            self.data = None
         return
 
     def get_data(self):
-        if self.data is None:
-            self.decode()
-        return self.data
+        if self.data_cache is not None:
+            # counts the hit or miss and refreshes the entry
+            self.data_cache.get((self.objid, self.genno))
+        # read once, another thread may release it
+        data = self.data
+        if data is None:
+            data = self.decode()
+        return data
+
+    def iter_data(self):
+        """Yields the decoded data in chunks. Unless it was already decoded,
+        the data is decoded on the fly and never held as a whole."""
+        (data, rawdata) = (self.data, self.rawdata)
+        if data is None and rawdata is None:
+            # decoded by another thread between the two reads
+            data = self.data
+        if data is not None:
+            yield data
+        else:
+            for chunk in self.iter_decode(rawdata):
+                yield chunk
+
+    def open_data(self):
+        """Returns a file object over the decoded data. Streams whose raw data
+        is at least streaming_min_size bytes are decoded while being read,
+        smaller ones are decoded (and kept) as with get_data."""
+        rawdata = self.rawdata
+        if self.data is not None or rawdata is None or len(rawdata) < self.streaming_min_size:
+            return BytesIO(self.get_data())
+        return ChunkReader(self.iter_data)
 
     def get_rawdata(self):
         return self.rawdata
\ No newline at end of file
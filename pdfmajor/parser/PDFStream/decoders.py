@@ -0,0 +1,91 @@
+import zlib
+
+from pdfmajor.execptions import PDFException
+from ...utils import settings, LZWDecoder
+
+# size of the chunks produced by the incremental decoders
+CHUNK_SIZE = 1 << 16
+
+def inflate_chunks(chunks, chunk_size: int = CHUNK_SIZE):
+    """Incremental FlateDecode, never produces more than chunk_size bytes at once."""
+    decompressor = zlib.decompressobj()
+    try:
+        for chunk in chunks:
+            data = decompressor.decompress(chunk, chunk_size)
+            while data:
+                yield data
+                # the input left over once chunk_size bytes were produced
+                data = decompressor.decompress(decompressor.unconsumed_tail, chunk_size)
+            if decompressor.eof:
+                break
+        data = decompressor.flush()
+        if data:
+            yield data
+    except zlib.error as e:
+        # will get errors if the document is encrypted.
+        if settings.STRICT:
+            raise PDFException('Invalid zlib bytes: %r' % e)
+        return
+    if settings.STRICT and not decompressor.eof:
+        raise PDFException('Invalid zlib bytes: truncated stream')
+
+def lzw_chunks(chunks):
+    """Incremental LZWDecode."""
+    return LZWDecoder(ChunkReader(lambda: chunks)).run()
+
+def whole_chunks(decode, chunks, *args):
+    """Runs a decoder that needs all of its input at once."""
+    yield decode(b''.join(chunks), *args)
+
+class ChunkReader:
+    """Read-only file object over the chunks returned by make_chunks().
+
+    Only the current chunk is held. Seeking back before it calls
+    make_chunks() again and skips forward from the start.
+    """
+
+    def __init__(self, make_chunks):
+        self.make_chunks = make_chunks
+        self._restart()
+
+    def _restart(self):
+        self.chunks = iter(self.make_chunks())
+        self.buf = b''
+        # offset of buf in the data and of the cursor in buf
+        self.bufpos = 0
+        self.offset = 0
+
+    def _next_chunk(self) -> bool:
+        for chunk in self.chunks:
+            if chunk:
+                self.bufpos += len(self.buf)
+                self.buf = chunk
+                self.offset = 0
+                return True
+        return False
+
+    def tell(self) -> int:
+        return self.bufpos + self.offset
+
+    def seek(self, pos: int, whence: int = 0):
+        assert whence == 0, 'only absolute positions are supported'
+        if pos < self.bufpos:
+            self._restart()
+        while self.bufpos + len(self.buf) < pos and self._next_chunk():
+            pass
+        self.offset = min(pos - self.bufpos, len(self.buf))
+        return self.tell()
+
+    def read(self, n: int = -1) -> bytes:
+        parts = []
+        while n != 0:
+            if len(self.buf) <= self.offset and not self._next_chunk():
+                break
+            if n < 0:
+                data = self.buf[self.offset:]
+            else:
+                data = self.buf[self.offset:self.offset+n]
+                n -= len(data)
+            self.offset += len(data)
+            parts.append(data)
+        return b''.join(parts)
@@ -17,6 +17,20 @@ def resolve1(x, default=None):
     return x
 
 
+def resolve_refs(x):
+    """Copies a dict or a list (and the ones nested in it) with its
+    indirect references replaced by their objects, which are not copied.
+    Used before pickling objects away from their document.
+    """
+    if isinstance(x, PDFObjRef):
+        return resolve1(x)
+    if isinstance(x, list):
+        return [resolve_refs(v) for v in x]
+    if isinstance(x, dict):
+        return {k: resolve_refs(v) for (k, v) in x.items()}
+    return x
+
+
 def resolve_all(x, default=None):
     """Recursively resolves the given object and all the internals.
 
@@ -1,4 +1,7 @@
+import copy
 import logging
+import mmap
+from collections import deque
 
 log = logging.getLogger(__name__)
 
@@ -7,24 +10,53 @@ from typing import List, Tuple, Union
 
 from pdfmajor.execptions import PSEOF
 from ...utils import int2byte
+from ..ByteSource import FileCursor
 
 from .constants import EOL, NONSPC, KWD, END_LITERAL, LIT, HEX
 from .constants import SPC, HEX_PAIR
 from .constants import END_NUMBER, END_STRING, END_KEYWORD, END_HEX_STRING
 from .constants import OCT_STRING, ESC_STRING, KEYWORD_DICT_BEGIN, KEYWORD_DICT_END
+from .constants import BULK_TOKEN, KEYWORD_STREAM, KEYWORD_ID
 from .types import PSLiteral
 
 class PSBaseParser(object):
 
     """Most basic PostScript parser that performs only tokenization.
+
+    With use_mmap=True the whole file is memory-mapped and scanned as a
+    single buffer instead of being read in BUFSIZ chunks.
+
+    Tokens are scanned ahead in bulk with one regular expression, the state
+    machine (the _parse_* methods) only handles the tokens that it cannot
+    match: escapes, nested strings and tokens cut by the end of the buffer.
     """
     BUFSIZ = 4096
+    # set to False to only use the state machine
+    bulk_scan = True
+    # bytes scanned ahead after a seek, doubled on every scan up to BUFSIZ
+    SCAN_WINDOW = 256
 
-    def __init__(self, fp: TextIOWrapper):
+    def __init__(self, fp: TextIOWrapper, use_mmap: bool = False):
         self.fp = fp
+        self._map = None
+        # forks share the map, only the parser that opened it closes it
+        self._owns_map = False
+        if use_mmap:
+            self._map = self._open_map(fp)
+            self._owns_map = self._map is not None
         self.seek(0)
         return
 
+    @staticmethod
+    def _open_map(fp):
+        """Maps the file read-only, returns None when it cannot be mapped
+        (in-memory buffers, pipes or empty files)."""
+        try:
+            return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError) as e:
+            log.info('mmap not available, reading in chunks: %r', e)
+            return None
+
     def __repr__(self):
         return '<%s: %r, bufpos=%d>' % (self.__class__.__name__, self.fp, self.bufpos)
 
@@ -32,9 +64,29 @@ class PSBaseParser(object):
         return
 
     def close(self):
+        """Releases the memory map, the file is left to its owner."""
         self.flush()
+        if self._map is not None:
+            if self._owns_map:
+                try:
+                    self._map.close()
+                except BufferError:
+                    # streams still hold views of it, it is unmapped with them
+                    log.debug('map in use, left to be released with its views')
+            self._map = None
+            self._owns_map = False
+            self.buf = b''
         return
 
+    def fork(self):
+        """Returns a parser over the same file (and map) with a cursor of
+        its own, for another thread to use while this one is in use."""
+        parser = copy.copy(self)
+        parser._owns_map = False
+        parser.fp = FileCursor(self.fp)
+        parser.seek(0)
+        return parser
+
     def tell(self):
         return self.bufpos+self.charpos
 
@@ -51,21 +103,32 @@ class PSBaseParser(object):
         """Seeks the parser to the given position.
         """
         log.debug('seek: %r', pos)
-        self.fp.seek(pos)
-        # reset the status for nextline()
-        self.bufpos: int = pos
-        self.buf: bytes = b''
-        self.charpos: int = 0
+        if self._map is not None:
+            # the whole file is the buffer, only the cursor moves.
+            self.bufpos: int = 0
+            self.buf: bytes = self._map
+            self.charpos: int = pos
+        else:
+            self.fp.seek(pos)
+            # reset the status for nextline()
+            self.bufpos: int = pos
+            self.buf: bytes = b''
+            self.charpos: int = 0
         # reset the status for nexttoken()
         self._current_parse_func = self._parse_main
         self._curtoken: bytes = b''
         self._curtokenpos: int = 0
         self._tokens: List[Tuple[int, Union[int, float, bool, str, bytes, PSLiteral]]] = []
+        # (pos, token, end) found by _scan_tokens and not returned yet
+        self._scanned = deque()
+        self._scan_window = self.SCAN_WINDOW
         return
 
     def fillbuf(self):
         if self.charpos < len(self.buf):
             return
+        if self._map is not None:
+            raise PSEOF('Unexpected EOF')
         # fetch next chunk.
         self.bufpos = self.fp.tell()
         self.buf = self.fp.read(self.BUFSIZ)
@@ -77,6 +140,8 @@ class PSBaseParser(object):
     def nextline(self):
         """Fetches a next line that ends either with \\r or \\n.
         """
+        # the position is the end of the last token returned
+        self._scanned.clear()
         linebuf = b''
         linepos = self.bufpos + self.charpos
         eol = False
@@ -108,6 +173,10 @@ class PSBaseParser(object):
 
         This is used to locate the trailers at the end of a file.
         """
+        if self._map is not None:
+            for line in self._revreadlines_map():
+                yield line
+            return
         self.fp.seek(0, 2)
         pos = self.fp.tell()
         buf = b''
@@ -128,6 +197,20 @@ class PSBaseParser(object):
                 buf = b''
         return
 
+    def _revreadlines_map(self):
+        buf = self._map
+        end = start = len(buf)
+        while 0 < start:
+            # only look one block further back at a time
+            start = max(0, start-self.BUFSIZ)
+            while 1:
+                n = max(buf.rfind(b'\r', start, end), buf.rfind(b'\n', start, end))
+                if n == -1:
+                    break
+                yield buf[n:end]
+                end = n
+        return
+
     def _parse_main(self, s, i):
         m = NONSPC.search(s, i)
         if not m:
@@ -337,7 +420,71 @@ class PSBaseParser(object):
         self._current_parse_func = self._parse_main
         return j
 
+    def _scan_tokens(self, s, i):
+        """Queues the tokens of s[i:] (up to a window of _scan_window bytes)
+        until one of them needs the state machine."""
+        endpos = min(len(s), i+self._scan_window)
+        self._scan_window = min(self.BUFSIZ, self._scan_window*2)
+        append = self._scanned.append
+        bufpos = self.bufpos
+        for m in BULK_TOKEN.finditer(s, i, endpos):
+            kind = m.lastgroup
+            end = m.end()
+            if end == endpos and kind in ('number', 'keyword', 'literal', 'comment', 'gt', 'slow'):
+                # the token may go on past the window
+                break
+            text = m.group(kind)
+            if kind == 'number':
+                try:
+                    token = float(text) if b'.' in text else int(text)
+                except ValueError:
+                    continue
+            elif kind == 'keyword':
+                if text == b'true':
+                    token = True
+                elif text == b'false':
+                    token = False
+                else:
+                    token = KWD(text)
+            elif kind == 'literal':
+                if s[end:end+1] == b'#':
+                    break
+                name = text[1:]
+                try:
+                    name = str(name,'utf-8')
+                except:
+                    pass
+                token = LIT(name)
+            elif kind == 'string':
+                token = text[1:-1]
+            elif kind == 'char':
+                token = KWD(text)
+            elif kind == 'dict_begin':
+                token = KEYWORD_DICT_BEGIN
+            elif kind == 'dict_end':
+                token = KEYWORD_DICT_END
+            elif kind == 'hexstring':
+                token = HEX_PAIR.sub(lambda m: int2byte(int(m.group(0), 16)),SPC.sub(b'', text[1:]))
+            elif kind == 'slow':
+                break
+            else:
+                # comments and lone '>' produce nothing
+                continue
+            append((bufpos+m.start(kind), token, end))
+            if token is KEYWORD_STREAM or token is KEYWORD_ID:
+                # the raw data that follows is read by the parser on its own,
+                # scanning it would intern whatever words it happens to
+                # contain for good
+                break
+        return
+
     def nexttoken(self):
+        if not self._scanned and not self._tokens and self.bulk_scan and self._current_parse_func == self._parse_main:
+            self.fillbuf()
+            self._scan_tokens(self.buf, self.charpos)
+        if self._scanned:
+            (pos, token, self.charpos) = self._scanned.popleft()
+            return (pos, token)
         while not self._tokens:
             self.fillbuf()
             self.charpos = self._current_parse_func(self.buf, self.charpos)
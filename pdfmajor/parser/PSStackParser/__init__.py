@@ -40,8 +40,8 @@ def keyword_name(x):
 
 class PSStackParser(PSBaseParser):
 
-    def __init__(self, fp: TextIOWrapper):
-        PSBaseParser.__init__(self, fp)
+    def __init__(self, fp: TextIOWrapper, use_mmap: bool = False):
+        PSBaseParser.__init__(self, fp, use_mmap=use_mmap)
         self.reset()
         return
 
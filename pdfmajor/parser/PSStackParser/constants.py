@@ -5,12 +5,22 @@ PSLiteralTable = PSSymbolTable(PSLiteral)
 PSKeywordTable = PSSymbolTable(PSKeyword)
 LIT = PSLiteralTable.intern
 KWD = PSKeywordTable.intern
+
+def intern_literal(name) -> PSLiteral:
+    return LIT(name)
+
+def intern_keyword(name) -> PSKeyword:
+    return KWD(name)
+
 KEYWORD_PROC_BEGIN = KWD(b'{')
 KEYWORD_PROC_END = KWD(b'}')
 KEYWORD_ARRAY_BEGIN = KWD(b'[')
 KEYWORD_ARRAY_END = KWD(b']')
 KEYWORD_DICT_BEGIN = KWD(b'<<')
 KEYWORD_DICT_END = KWD(b'>>')
+# raw stream and inline image data follow them, see PSBaseParser._scan_tokens
+KEYWORD_STREAM = KWD(b'stream')
+KEYWORD_ID = KWD(b'ID')
 
 ##  PSBaseParser
 ##
@@ -26,3 +36,20 @@ END_KEYWORD = re.compile(br'[#/%\[\]()<>{}\s]')
 END_STRING = re.compile(br'[()\134]')
 OCT_STRING = re.compile(br'[0-7]')
 ESC_STRING = {b'b': 8, b't': 9, b'n': 10, b'f': 12, b'r': 13, b'(': 40, b')': 41, b'\\': 92}
+
+# One alternative per kind of token, each one preceded by its whitespace.
+# Tokens that need the state machine (strings with escapes or nested
+# parentheses, literals with #xx escapes, ...) end up in `slow`.
+BULK_TOKEN = re.compile(br'\s*(?:' + br'|'.join([
+    br'(?P<number>[-+0-9][0-9]*(?:\.[0-9]*)?|\.[0-9]*)',
+    br'(?P<keyword>[A-Za-z][^#/%\[\]()<>{}\s]*)',
+    br'(?P<literal>/[^#/%\[\]()<>{}\s]*)',
+    br'(?P<string>\([^()\\]*\))',
+    br'(?P<dict_begin><<)',
+    br'(?P<dict_end>>>)',
+    br'(?P<hexstring><[0-9a-fA-F\s]*)(?=[^0-9a-fA-F\s])',
+    br'(?P<comment>%[^\r\n]*)',
+    br'(?P<gt>>)',
+    br'(?P<char>[^%/0-9+\-.A-Za-z(<>\s])',
+    br'(?P<slow>[\s\S])',
+]) + br')')
@@ -33,6 +33,11 @@ class PSLiteral(PSObject):
         name=self.name
         return '/%r' % name
 
+    def __reduce__(self):
+        # literals are compared by identity, so re-intern them when unpickled
+        from .constants import intern_literal
+        return (intern_literal, (self.name,))
+
 
 ##  PSKeyword
 ##
@@ -56,6 +61,11 @@ class PSKeyword(PSObject):
         name=self.name
         return '/%r' % name
 
+    def __reduce__(self):
+        # keywords are compared by identity, so re-intern them when unpickled
+        from .constants import intern_keyword
+        return (intern_keyword, (self.name,))
+
 
 ##  PSSymbolTable
 ##
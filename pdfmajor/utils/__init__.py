@@ -10,4 +10,5 @@ from .lzw import *
 from .matrix import *
 from .text import *
 from .types import *
-from .log import *
\ No newline at end of file
+from .log import *
+from .cache import *
\ No newline at end of file
@@ -0,0 +1,276 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+class CachePolicy:
+    """Limits of the caches kept by a PDFDocument.
+
+    - max_entries: maximum number of objects held, 0 for no limit
+    - max_bytes: rough memory budget of the parsed objects, 0 for no limit
+    - max_data_bytes: budget of decoded stream data (accounted separately
+      from the objects holding it, evicted streams keep their raw data to
+      be decoded again), 0 for none: the decoded data stays on its stream
+    - max_content_bytes: budget of the compiled content streams replayed
+      when a page or form is interpreted again (64 MiB by default), 0 for
+      no limit
+    - max_forms: interpreted form xobjects kept to be replayed where the
+      same form is painted again (256 by default), 0 for no limit
+    - max_resources: resolved maps (fonts, color spaces, xobjects) of
+      indirect /Resources kept for the pages and forms sharing them (256
+      by default), 0 for no limit
+    - eviction: 'lru' (least recently used) or 'lfu' (least frequently used)
+    """
+
+    def __init__(self,
+        max_entries: int = 0,
+        max_bytes: int = 0,
+        max_data_bytes: int = 0,
+        eviction: str = 'lru',
+        max_content_bytes: int = 64 << 20,
+        max_forms: int = 256,
+        max_resources: int = 256
+    ):
+        if eviction not in CACHE_TYPES:
+            raise ValueError(f"Unknown eviction policy {eviction!r}, expected one of {sorted(CACHE_TYPES)}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_data_bytes = max_data_bytes
+        self.max_content_bytes = max_content_bytes
+        self.max_forms = max_forms
+        self.max_resources = max_resources
+        self.eviction = eviction
+
+    def __repr__(self):
+        return '<CachePolicy %s: max_entries=%r, max_bytes=%r, max_data_bytes=%r, max_content_bytes=%r, max_forms=%r, max_resources=%r>' % (
+            self.eviction, self.max_entries, self.max_bytes, self.max_data_bytes,
+            self.max_content_bytes, self.max_forms, self.max_resources
+        )
+
+    def make_cache(self, sizeof: Callable[[Any], int] = None, on_evict: Callable = None) -> 'LRUCache':
+        return CACHE_TYPES[self.eviction](
+            max_entries=self.max_entries,
+            max_bytes=self.max_bytes,
+            sizeof=sizeof,
+            on_evict=on_evict
+        )
+
+    def make_data_cache(self, on_evict: Callable = None) -> 'LRUCache':
+        return CACHE_TYPES[self.eviction](
+            max_bytes=self.max_data_bytes,
+            sizeof=len,
+            on_evict=on_evict
+        )
+
+    def make_content_cache(self) -> 'LRUCache':
+        return CACHE_TYPES[self.eviction](
+            max_bytes=self.max_content_bytes,
+            sizeof=lambda content: content.nbytes
+        )
+
+    def make_form_cache(self) -> 'LRUCache':
+        return CACHE_TYPES[self.eviction](max_entries=self.max_forms)
+
+    def make_resource_cache(self) -> 'LRUCache':
+        return CACHE_TYPES[self.eviction](max_entries=self.max_resources)
+
+class LRUCache:
+    """A mapping bounded by entry count and/or size that evicts the least
+    recently used entries first. Keeps hit/miss/eviction counters.
+
+    Every operation holds a lock, so threads may share a cache.
+    """
+
+    def __init__(self,
+        max_entries: int = 0,
+        max_bytes: int = 0,
+        sizeof: Callable[[Any], int] = None,
+        on_evict: Callable[[Hashable, Any], None] = None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return '<%s: entries=%d, bytes=%d>' % (self.__class__.__name__, len(self), self.nbytes)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def keys(self):
+        return self._entries.keys()
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __delitem__(self, key):
+        self.pop(key)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._touch(key)
+            return value
+
+    def put(self, key, value, size: int = None):
+        if size is None:
+            size = self.sizeof(value) if self.sizeof is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self.pop(key)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self.nbytes += size
+            self._added(key)
+            self._shrink(keep=key)
+        return
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries.pop(key)
+            self.nbytes -= self._sizes.pop(key)
+            self._removed(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+        return
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self),
+                'bytes': self.nbytes,
+            }
+
+    def _over_budget(self) -> bool:
+        return (
+            (self.max_entries and len(self._entries) > self.max_entries) or
+            (self.max_bytes and self.nbytes > self.max_bytes)
+        )
+
+    def _shrink(self, keep):
+        # the entry just added stays even if it is larger than the budget on its own
+        while self._over_budget() and len(self._entries) > 1:
+            key = self._victim(keep)
+            value = self.pop(key)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(key, value)
+        return
+
+    # eviction order hooks
+    def _touch(self, key):
+        self._entries.move_to_end(key)
+
+    def _added(self, key):
+        pass
+
+    def _removed(self, key):
+        pass
+
+    def _victim(self, keep):
+        for key in self._entries:
+            if key != keep:
+                return key
+
+class LFUCache(LRUCache):
+    """Same as LRUCache but evicts the least frequently used entries first,
+    ties are broken by recency.
+    """
+
+    def __init__(self, *args, **kwargs):
+        LRUCache.__init__(self, *args, **kwargs)
+        self._counts = {}
+        # use count -> keys with that count, oldest first
+        self._buckets = {}
+        self._min_count = 0
+
+    def clear(self):
+        with self._lock:
+            LRUCache.clear(self)
+            self._counts.clear()
+            self._buckets.clear()
+            self._min_count = 0
+
+    def _touch(self, key):
+        count = self._counts[key]
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+            if self._min_count == count:
+                self._min_count = count+1
+        self._counts[key] = count+1
+        self._buckets.setdefault(count+1, OrderedDict())[key] = None
+
+    def _added(self, key):
+        self._counts[key] = 1
+        self._buckets.setdefault(1, OrderedDict())[key] = None
+        self._min_count = 1
+
+    def _removed(self, key):
+        count = self._counts.pop(key)
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+            if self._min_count == count and self._buckets:
+                self._min_count = min(self._buckets)
+
+    def _victim(self, keep):
+        for key in self._buckets[self._min_count]:
+            if key != keep:
+                return key
+        for count in sorted(self._buckets):
+            for key in self._buckets[count]:
+                if key != keep:
+                    return key
+
+_MISSING = object()
+
+CACHE_TYPES = {
+    'lru': LRUCache,
+    'lfu': LFUCache,
+}
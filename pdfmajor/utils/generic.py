@@ -25,46 +25,57 @@ def compatible_encode_method(bytesorstring, encoding='utf-8', erraction='ignore'
 
 ##  PNG Predictor
 ##
-def apply_png_predictor(pred, colors, columns, bitspercomponent, data):
+def png_predictor_row(ft, line0, line1):
+    """Decodes one row of PNG predicted data given the previous (decoded) row."""
+    line2 = bytearray()
+    if ft == 0:
+        # PNG none
+        line2 += line1
+    elif ft == 1:
+        # PNG sub (UNTESTED)
+        c = 0
+        for b in line1:
+            c = (c+b) & 255
+            line2.append(c)
+    elif ft == 2:
+        # PNG up
+        for (a, b) in zip(line0, line1):
+            c = (a+b) & 255
+            line2.append(c)
+    elif ft == 3:
+        # PNG average (UNTESTED)
+        c = 0
+        for (a, b) in zip(line0, line1):
+            c = ((c+a+b)//2) & 255
+            line2.append(c)
+    else:
+        # unsupported
+        raise ValueError("Unsupported predictor value: %d" % ft)
+    return bytes(line2)
+
+def iter_png_predictor(pred, colors, columns, bitspercomponent, chunks):
+    """Same as apply_png_predictor over an iterable of chunks, yields one row at a time."""
     if bitspercomponent != 8:
         # unsupported
         raise ValueError("Unsupported `bitspercomponent': %d" %
                          bitspercomponent)
     nbytes = colors * columns * bitspercomponent // 8
-    i = 0
-    buf = b''
     line0 = b'\x00' * columns
-    for i in range(0, len(data), nbytes+1):
-        ft = data[i]
-        i += 1
-        line1 = data[i:i+nbytes]
-        line2 = b''
-        if ft == 0:
-            # PNG none
-            line2 += line1
-        elif ft == 1:
-            # PNG sub (UNTESTED)
-            c = 0
-            for b in line1:
-                c = (c+b) & 255
-                line2 += int2byte(c)
-        elif ft == 2:
-            # PNG up
-            for (a, b) in zip(line0, line1):
-                c = (a+b) & 255
-                line2 += int2byte(c)
-        elif ft == 3:
-            # PNG average (UNTESTED)
-            c = 0
-            for (a, b) in zip(line0, line1):
-                c = ((c+a+b)//2) & 255
-                line2 += int2byte(c)
-        else:
-            # unsupported
-            raise ValueError("Unsupported predictor value: %d" % ft)
-        buf += line2
-        line0 = line2
-    return buf
+    pending = b''
+    for chunk in chunks:
+        pending += chunk
+        i = 0
+        while i+nbytes+1 <= len(pending):
+            line0 = png_predictor_row(pending[i], line0, pending[i+1:i+nbytes+1])
+            yield line0
+            i += nbytes+1
+        pending = pending[i:]
+    if pending:
+        # a truncated last row
+        yield png_predictor_row(pending[0], line0, pending[1:])
+
+def apply_png_predictor(pred, colors, columns, bitspercomponent, data):
+    return b''.join(iter_png_predictor(pred, colors, columns, bitspercomponent, [data]))
 
 
 
@@ -131,11 +142,11 @@ def nunpack(s, default=0):
     if not l:
         return default
     elif l == 1:
-        return ord(s)
+        return s[0]
     elif l == 2:
         return struct.unpack('>H', s)[0]
     elif l == 3:
-        return struct.unpack('>L', b'\x00'+s)[0]
+        return struct.unpack('>L', b'\x00'+bytes(s))[0]
     elif l == 4:
         return struct.unpack('>L', s)[0]
     elif l == 8:
@@ -11,6 +11,15 @@ def mult_matrix(m1, m0):
             a0*e1+c0*f1+e0, b0*e1+d0*f1+f0)
 
 
+def invert_matrix(m):
+    """Returns the inverse of a matrix, None when it is singular."""
+    (a, b, c, d, e, f) = m
+    det = a*d-b*c
+    if det == 0:
+        return None
+    return (d/det, -b/det, -c/det, a/det, (c*f-d*e)/det, (b*e-a*f)/det)
+
+
 def translate_matrix(m, v):
     """Translates a matrix by (x, y)."""
     (a, b, c, d, e, f) = m
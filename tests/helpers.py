@@ -0,0 +1,54 @@
+import os
+import asyncio
+
+from pdfmajor.interpreter import PDFInterpreter, AsyncPDFInterpreter, InterpretedPage, logging
+from pdfmajor.interpreter.commands import LTContainer, LTCharBlock
+
+CUR_PATH = os.path.dirname(os.path.dirname(__file__))
+INPUT_FOLDER = os.path.join(
+    CUR_PATH, "tests/samples/pdf"
+)
+FILES = [
+    "font-color.pdf",
+    "lorem-v4.pdf",
+    "tables.pdf",
+]
+
+def describe(items, out: list):
+    for item in items:
+        if isinstance(item, LTCharBlock):
+            out.append((type(item).__name__, str(item.bbox), item.get_text(), item.fontname))
+        else:
+            out.append((type(item).__name__, str(getattr(item, 'bbox', None))))
+        if isinstance(item, LTContainer):
+            describe(item, out)
+    return out
+
+def run_interpreter(file_path: str, **kwargs) -> (list, dict):
+    """The (page_num, width, height, items) of the pages of a file and the
+    cache stats of the run."""
+    interpreter = PDFInterpreter(file_path, debug_level=logging.ERROR, ignore_bad_chars=True, **kwargs)
+    pages = [(page.page_num, page.width, page.height, describe(page, [])) for page in interpreter]
+    return (pages, interpreter.cache_stats())
+
+def run_file(file_path: str, **kwargs) -> list:
+    return run_interpreter(file_path, **kwargs)[0]
+
+def run(coro):
+    """asyncio.run, which Python 3.6 does not have."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+async def collect(interpreter: AsyncPDFInterpreter) -> list:
+    pages = []
+    async for page in interpreter:
+        assert isinstance(page, InterpretedPage)
+        pages.append((page.page_num, page.width, page.height, describe(page, [])))
+    return pages
+
+def run_async_file(file_path: str, **kwargs) -> list:
+    return run(collect(AsyncPDFInterpreter(file_path, debug_level=logging.ERROR, ignore_bad_chars=True, **kwargs)))